@@ -3,10 +3,17 @@
 import sys
 import os
 import struct
+import mmap
+import functools
 from pathlib import Path
 from PIL import Image
 import numpy as np
 
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
 __version__ = "1.0.0"
 
 
@@ -168,20 +175,13 @@ def extract_palette_from_strip(img):
     if h % scale != 0:
         raise ValueError(f"Strip PNG height must be multiple of scale={scale}. Got {h}.")
     
-    rows = h // scale
-    
-    # Downscale if needed
+    # Downscale if needed (strided view, samples the same pixel as NEAREST)
+    arr = np.asarray(img)
     if scale != 1:
-        img = img.resize((COLORS, rows), Image.NEAREST)
+        arr = arr[scale // 2::scale, scale // 2::scale]
     
     # Extract first row
-    px = img.load()
-    pal = []
-    for x in range(COLORS):
-        r, g, b = px[x, 0][:3]  # Handle RGBA
-        pal.append((r, g, b))
-    
-    return pal
+    return [tuple(c) for c in arr[0, :, :3].tolist()]  # Handle RGBA
 
 
 def extract_palette_from_grid(img):
@@ -290,20 +290,11 @@ def load_all_palettes(path):
             if w % COLORS != 0:
                 raise ValueError(f"Invalid PLAYPAL width: {w}")
             scale = w // COLORS
+            arr = np.asarray(img)
             if scale > 1:
-                img = img.resize((COLORS, h // scale), Image.NEAREST)
-            
-            px = img.load()
-            palettes = []
-            
-            for row in range(14):
-                pal = []
-                for x in range(COLORS):
-                    r, g, b = px[x, row][:3]
-                    pal.append((r, g, b))
-                palettes.append(pal)
+                arr = arr[scale // 2::scale, scale // 2::scale]
             
-            return palettes
+            return [[tuple(c) for c in row] for row in arr[:14].tolist()]
     
     elif kind == "playpal.pal binary":
         data = path.read_bytes()
@@ -402,6 +393,20 @@ def expand_palette_to_14(pal0):
 # ============================================================================
 
 
+# Luminance weights for the invulnerability row (Doom's own 0.144 blue weight)
+INVULN_LUMA = (0.299, 0.587, 0.144)
+
+
+@functools.lru_cache(maxsize=16)
+def _invuln_row(pal_bytes):
+    """Row 32 for a palette given as int32 RGB bytes, shared by lit and blank colormaps"""
+    pal = np.frombuffer(pal_bytes, dtype=np.int32).reshape(-1, 3)
+    # Convert every entry to grayscale and invert, then match them all at once
+    f = pal / 255.0
+    gray = f[:, 0] * INVULN_LUMA[0] + f[:, 1] * INVULN_LUMA[1] + f[:, 2] * INVULN_LUMA[2]
+    gray = 1.0 - gray
+    gv = (gray * 255).astype(np.int32)
+    return tuple(_quantize_kernel(np.stack([gv, gv, gv], axis=1), pal).tolist())
 
 
 def generate_colormap(palette, with_lighting=True):
@@ -417,39 +422,30 @@ def generate_colormap(palette, with_lighting=True):
         List of 34 lists, each containing 256 palette indices
     """
     colormap = []
+    pal = np.asarray(palette, dtype=np.int32)
     
     if with_lighting:
         # Normal light levels (rows 0-31): progressive darkening
-        for level in range(NUMLIGHTS):
-            row = []
-            for r, g, b in palette:
-                # Darken based on light level
-                # Level 0 = full bright, level 31 = darkest
-                nr = (r * (NUMLIGHTS - level) + NUMLIGHTS // 2) // NUMLIGHTS
-                ng = (g * (NUMLIGHTS - level) + NUMLIGHTS // 2) // NUMLIGHTS
-                nb = (b * (NUMLIGHTS - level) + NUMLIGHTS // 2) // NUMLIGHTS
-                idx = best_color(nr, ng, nb, palette)
-                row.append(idx)
-            colormap.append(row)
+        # Level 0 = full bright, level 31 = darkest. All 32 levels are darkened
+        # as one (32, 256, 3) tensor and matched with a single batched best_color
+        levels = np.arange(NUMLIGHTS)[:, None, None]
+        darkened = ((pal[None] * (NUMLIGHTS - levels) + NUMLIGHTS // 2) // NUMLIGHTS).reshape(-1, 3)
+        
+        # Darker levels collapse many colours together: match each distinct
+        # colour once (packed into a 24-bit key) and scatter the result back
+        keys = (darkened[:, 0] << 16) | (darkened[:, 1] << 8) | darkened[:, 2]
+        uniq, inverse = np.unique(keys, return_inverse=True)
+        colours = np.stack([uniq >> 16, (uniq >> 8) & 0xFF, uniq & 0xFF], axis=1).astype(np.int32)
+        lit = _quantize_kernel(colours, pal)[inverse.ravel()]
+        colormap.extend(lit.reshape(NUMLIGHTS, COLORS).tolist())
     else:
         # No lighting: all rows 0-31 are full brightness (identity mapping)
         full_bright_row = list(range(COLORS))
         for _ in range(NUMLIGHTS):
             colormap.append(full_bright_row[:])
     
-    # Row 32: Invulnerability effect (inverse grayscale)
-    invuln = []
-    for r, g, b in palette:
-        # Convert to grayscale and invert
-        fr = r / 255.0
-        fg = g / 255.0
-        fb = b / 255.0
-        gray = fr * 0.299 + fg * 0.587 + fb * 0.144
-        gray = 1.0 - gray
-        gv = int(gray * 255)
-        idx = best_color(gv, gv, gv, palette)
-        invuln.append(idx)
-    colormap.append(invuln)
+    # Row 32: Invulnerability effect (inverse grayscale), computed once per palette
+    colormap.append(list(_invuln_row(pal.tobytes())))
     
     # Row 33: Pure black (unused in vanilla Doom, but expected by tools)
     black_row = [best_color(0, 0, 0, palette)] * COLORS
@@ -467,18 +463,11 @@ def colormap_to_png(colormap, palette, output_path):
         palette: List of 256 (r, g, b) tuples
         output_path: Where to save the PNG
     """
-    h = len(colormap)
-    w = COLORS
-    
-    img = Image.new("RGB", (w, h))
-    px = img.load()
-    
-    for y in range(h):
-        for x in range(w):
-            idx = colormap[y][x]
-            px[x, y] = palette[idx]
+    # Look every entry up in the palette at once: (rows, 256) indices -> (rows, 256, 3) RGB
+    pal = np.asarray(palette, dtype=np.uint8)
+    rgb = pal[np.asarray(colormap, dtype=np.intp)]
     
-    img.save(output_path)
+    Image.fromarray(rgb, "RGB").save(output_path)
 
 
 def colormap_to_binary(colormap):
@@ -491,11 +480,9 @@ def colormap_to_binary(colormap):
     Returns:
         bytes object (8704 bytes)
     """
-    data = bytearray()
-    for row in colormap:
-        for idx in row:
-            data.append(idx)
-    return bytes(data)
+    if any(len(row) != COLORS for row in colormap):
+        raise ValueError(f"Colormap rows must each have {COLORS} entries")
+    return np.asarray(colormap, dtype=np.uint8).tobytes()
 
 # ============================================================================
 # MODULE: hald.py
@@ -556,6 +543,63 @@ def generate_hald_identity(size=8):
     return img
 
 
+def _quantize_numpy(pixels, pal):
+    """
+    Nearest palette index for each pixel (same rules as best_color).
+    
+    Args:
+        pixels: int32 array (N, 3)
+        pal: int32 array (256, 3)
+        
+    Returns:
+        int64 array (N,) of palette indices
+    """
+    out = np.empty(len(pixels), dtype=np.int64)
+    pal_f = pal.astype(np.float64)
+    pal_sq = (pal_f * pal_f).sum(axis=1)
+    chunk = 4096
+    for start in range(0, len(pixels), chunk):
+        block = pixels[start:start + chunk].astype(np.float64)
+        # |p - c|² = |p|² - 2 p·c + |c|²: one matmul instead of an (N, 256, 3)
+        # temp. Every term is a small integer, so float64 stays exact (ties included)
+        block_sq = (block * block).sum(axis=1)
+        dist = block_sq[:, None] - 2.0 * (block @ pal_f.T) + pal_sq[None, :]
+        idx = dist.argmin(axis=1)
+        # best_color only accepts a match closer than 2*(r²+g²+b²)
+        best = dist[np.arange(len(block)), idx]
+        idx[best >= block_sq * 2] = 0
+        out[start:start + chunk] = idx
+    return out
+
+
+if njit is not None:
+    @njit(cache=True, parallel=True, fastmath=True)
+    def _quantize_kernel(pixels, pal):
+        """Numba version of _quantize_numpy, compiled once and cached"""
+        n = pixels.shape[0]
+        out = np.empty(n, dtype=np.int64)
+        for i in prange(n):
+            r = pixels[i, 0]
+            g = pixels[i, 1]
+            b = pixels[i, 2]
+            best_dist = (r * r + g * g + b * b) * 2
+            best_index = 0
+            for j in range(pal.shape[0]):
+                dr = r - pal[j, 0]
+                dg = g - pal[j, 1]
+                db = b - pal[j, 2]
+                dist = dr * dr + dg * dg + db * db
+                if dist < best_dist:
+                    best_dist = dist
+                    best_index = j
+                    if dist == 0:
+                        break
+            out[i] = best_index
+        return out
+else:
+    _quantize_kernel = _quantize_numpy
+
+
 def remap_hald_to_palette(hald_img, palette):
     """
     Remap a HALD CLUT to a Doom palette (quantization).
@@ -571,19 +615,14 @@ def remap_hald_to_palette(hald_img, palette):
         PIL Image (remapped to palette, still in RGB mode)
     """
     w, h = hald_img.size
-    result = Image.new("RGB", (w, h))
     
-    src_px = hald_img.load()
-    dst_px = result.load()
+    src = np.asarray(hald_img.convert("RGB"), dtype=np.int32).reshape(-1, 3)
+    pal = np.asarray(palette, dtype=np.int32)
     
     # Quantize each pixel to nearest palette color
-    for y in range(h):
-        for x in range(w):
-            r, g, b = src_px[x, y][:3]
-            idx = best_color(r, g, b, palette)
-            dst_px[x, y] = palette[idx]
+    idx = _quantize_kernel(src, pal)
     
-    return result
+    return Image.fromarray(pal[idx].astype(np.uint8).reshape(h, w, 3), "RGB")
 
 
 def generate_palette_hald(palette, size=8):
@@ -665,8 +704,10 @@ def hald_to_cube(hald_image, output_path, title=None):
     # Validate dimensions
     lut_size = validate_lut_dimensions(img_array)
     
-    # Flatten and normalize to 0.0-1.0
-    pixels = img_array.reshape(-1, 3).astype(np.float32) / 255.0
+    # Flatten as a view; the bytes stay uint8 and are normalized to 0.0-1.0
+    # through a 256-entry table of preformatted values while writing
+    pixels = img_array.reshape(-1, 3)
+    levels = np.array(["%.6f" % v for v in (np.arange(256, dtype=np.float32) / 255.0).tolist()], dtype=object)
     
     # Determine title
     if title is None:
@@ -679,13 +720,14 @@ def hald_to_cube(hald_image, output_path, title=None):
         f.write("DOMAIN_MIN 0.0 0.0 0.0\n")
         f.write("DOMAIN_MAX 1.0 1.0 1.0\n")
         
-        # Write LUT data in correct order: B→G→R
-        for b in range(lut_size):
-            for g in range(lut_size):
-                for r in range(lut_size):
-                    idx = r + g * lut_size + b * lut_size * lut_size
-                    r_out, g_out, b_out = pixels[idx]
-                    f.write(f"{r_out:.6f} {g_out:.6f} {b_out:.6f}\n")
+        # Write LUT data in correct order: B→G→R. The HALD stores pixels with R
+        # fastest (idx = r + g*N + b*N*N), which is already that order, so the
+        # pixels are formatted straight through, one block of lines at a time
+        data = pixels[:lut_size ** 3]
+        line = "%s %s %s\n"
+        for start in range(0, len(data), 65536):
+            block = levels[data[start:start + 65536]]
+            f.write((line * len(block)) % tuple(block.ravel().tolist()))
 
 
 def palette_to_cube(palette, output_path, title=None):
@@ -716,6 +758,11 @@ def palette_to_cube(palette, output_path, title=None):
 
 
 
+# WAD header (magic, numlumps, diroffset) and directory entry (filepos, size, name)
+_WAD_HEADER = struct.Struct("<4sII")
+_WAD_DIR_ENTRY = struct.Struct("<II8s")
+
+
 class WADFile:
     """Simple WAD file reader for extracting lumps"""
     
@@ -729,20 +776,53 @@ class WADFile:
         self.path = Path(path)
         self.lumps = {}
         
+        # Map the file once; lumps are sliced straight out of the mapping
         with open(self.path, "rb") as f:
-            # Read WAD header
-            magic = f.read(4)
-            if magic not in (b"IWAD", b"PWAD"):
+            if os.fstat(f.fileno()).st_size < _WAD_HEADER.size:
                 raise ValueError(f"Not a valid WAD file: {path}")
-            
-            numlumps, diroffset = struct.unpack("<II", f.read(8))
-            
-            # Read directory
-            f.seek(diroffset)
-            for _ in range(numlumps):
-                filepos, size = struct.unpack("<II", f.read(8))
-                name = f.read(8).rstrip(b'\x00').decode('ascii', errors='ignore')
-                self.lumps[name.upper()] = (filepos, size)
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        # Read WAD header
+        magic, numlumps, diroffset = _WAD_HEADER.unpack_from(self._mm, 0)
+        if magic not in (b"IWAD", b"PWAD"):
+            self.close()
+            raise ValueError(f"Not a valid WAD file: {path}")
+        
+        # Unpack the directory straight out of the mapping
+        dir_size = _WAD_DIR_ENTRY.size * numlumps
+        
+        # Ask the OS to fault the whole directory in up front rather than
+        # one page at a time (madvise isn't available on Windows)
+        if hasattr(self._mm, "madvise") and hasattr(mmap, "MADV_WILLNEED"):
+            start = diroffset - diroffset % mmap.PAGESIZE
+            length = min(diroffset + dir_size, len(self._mm)) - start
+            if length > 0:
+                self._mm.madvise(mmap.MADV_WILLNEED, start, length)
+        
+        with memoryview(self._mm) as view:
+            dir_view = view[diroffset:diroffset + dir_size]
+            self.lumps = {
+                name.rstrip(b'\x00').decode('ascii', errors='ignore').upper(): (filepos, size)
+                for filepos, size, name in _WAD_DIR_ENTRY.iter_unpack(dir_view)
+            }
+            dir_view.release()
+        
+        # Locate the Boom colormap markers once, while the order is at hand
+        order = list(self.lumps)
+        try:
+            self._boom_names = order[order.index("C_START") + 1:order.index("C_END")]
+        except ValueError:
+            self._boom_names = []  # No Boom colormaps
+    
+    def close(self):
+        """Unmap the WAD file"""
+        self._mm.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
     
     def has_lump(self, name):
         """Check if lump exists in WAD"""
@@ -767,9 +847,38 @@ class WADFile:
         
         filepos, size = self.lumps[name]
         
-        with open(self.path, "rb") as f:
-            f.seek(filepos)
-            return f.read(size)
+        return self._mm[filepos:filepos + size]
+    
+    def get(self, name, default=None):
+        """
+        Read lump data, or return default if the lump doesn't exist.
+        
+        Args:
+            name: Lump name (case-insensitive)
+            default: Value returned when the lump is missing
+            
+        Returns:
+            bytes object containing lump data, or default
+        """
+        entry = self.lumps.get(name.upper())
+        if entry is None:
+            return default
+        filepos, size = entry
+        return self._mm[filepos:filepos + size]
+    
+    def read_many(self, names):
+        """
+        Read several lumps in one forward pass over the file.
+        
+        Args:
+            names: Iterable of lump names (case-insensitive)
+            
+        Returns:
+            Dict of upper-cased name -> bytes, for the lumps that exist
+        """
+        found = [(self.lumps[n], n) for n in map(str.upper, names) if n in self.lumps]
+        found.sort()
+        return {n: self._mm[filepos:filepos + size] for (filepos, size), n in found}
     
     def list_lumps(self):
         """Get list of all lump names"""
@@ -782,17 +891,27 @@ class WADFile:
         Returns:
             List of colormap lump names
         """
-        lumps = self.list_lumps()
-        
-        # Find C_START and C_END
-        try:
-            start_idx = lumps.index("C_START")
-            end_idx = lumps.index("C_END")
-        except ValueError:
-            return []  # No Boom colormaps
+        return list(self._boom_names)
+
+
+@functools.lru_cache(maxsize=8)
+def _open_wad_cached(path_str, mtime):
+    """Parse a WAD once per (path, mtime) pair"""
+    return WADFile(path_str)
+
+
+def _open_wad(wad_path):
+    """
+    Get a parsed WADFile, reusing the directory from earlier calls.
+    
+    Args:
+        wad_path: Path to WAD file
         
-        # Return lumps between markers
-        return lumps[start_idx + 1:end_idx]
+    Returns:
+        WADFile instance (shared - do not close)
+    """
+    path = Path(wad_path).resolve()
+    return _open_wad_cached(str(path), path.stat().st_mtime_ns)
 
 
 def extract_playpal(wad_path):
@@ -805,12 +924,7 @@ def extract_playpal(wad_path):
     Returns:
         bytes object (10752 bytes) or None if not found
     """
-    wad = WADFile(wad_path)
-    
-    if not wad.has_lump("PLAYPAL"):
-        return None
-    
-    return wad.read_lump("PLAYPAL")
+    return _open_wad(wad_path).get("PLAYPAL")
 
 
 def extract_colormap(wad_path, lump_name="COLORMAP"):
@@ -824,12 +938,7 @@ def extract_colormap(wad_path, lump_name="COLORMAP"):
     Returns:
         bytes object (8704 bytes) or None if not found
     """
-    wad = WADFile(wad_path)
-    
-    if not wad.has_lump(lump_name):
-        return None
-    
-    return wad.read_lump(lump_name)
+    return _open_wad(wad_path).get(lump_name)
 
 
 def read_wad_lump(wad_path, lump_name):
@@ -843,12 +952,7 @@ def read_wad_lump(wad_path, lump_name):
     Returns:
         bytes object or None if not found
     """
-    wad = WADFile(wad_path)
-    
-    if not wad.has_lump(lump_name):
-        return None
-    
-    return wad.read_lump(lump_name)
+    return _open_wad(wad_path).get(lump_name)
 
 
 def find_boom_colormaps(wad_path):
@@ -858,7 +962,7 @@ def find_boom_colormaps(wad_path):
     Returns:
         List of tuples (name, filepos, size)
     """
-    wad = WADFile(wad_path)
+    wad = _open_wad(wad_path)
     colormap_names = wad.find_boom_colormaps()
     
     # Return with filepos and size info
@@ -1239,21 +1343,18 @@ def cmd_batch_wad(wad_path, output_base):
     boom_colormaps = find_boom_colormaps(wad_path)
     if boom_colormaps and playpal_data:
         print(f"Found {len(boom_colormaps)} Boom colormap(s), extracting...")
-        with open(wad_path, 'rb') as f:
-            for name, filepos, size in boom_colormaps:
-                f.seek(filepos)
-                data = f.read(size)
-                
-                # Save as PNG
-                png_path = Path(f"{output_base}_{name}.png")
-                img = Image.new("RGB", (COLORS, 34))
-                px = img.load()
-                for row in range(34):
-                    for col in range(COLORS):
-                        idx = data[row * COLORS + col]
-                        px[col, row] = palette[idx] if idx < len(palette) else (0, 0, 0)
-                img.save(png_path)
-                outputs[f"Boom colormap ({name})"] = png_path
+        boom_data = _open_wad(wad_path).read_many(name for name, _, _ in boom_colormaps)
+        for name, data in boom_data.items():
+            # Save as PNG
+            png_path = Path(f"{output_base}_{name}.png")
+            img = Image.new("RGB", (COLORS, 34))
+            px = img.load()
+            for row in range(34):
+                for col in range(COLORS):
+                    idx = data[row * COLORS + col]
+                    px[col, row] = palette[idx] if idx < len(palette) else (0, 0, 0)
+            img.save(png_path)
+            outputs[f"Boom colormap ({name})"] = png_path
     
     print("\nGenerated files:")
     for name, path in outputs.items():
@@ -1494,7 +1595,7 @@ def cmd_extract(args):
         output_base = wad_path.stem
     
     try:
-        wad = WADFile(wad_path)
+        wad = _open_wad(wad_path)
         
         # Handle -boomlist
         if args.boomlist:
@@ -14,6 +14,9 @@ Options:
                           or hex code (#1ecbe1). Omit flag for transparent.
                           Use: -b (black), -b #1ecbe1 (custom color)
   --layers                Generate separate layer PNGs for each line type
+  --png-compress N        PNG zlib level 0-9 (default: 1, fast)
+  -j, --jobs N            Draw maps in N worker processes (default: 1,
+                          0 = one per CPU core)
   -h, --help              Show this help message
 
 Outputs:
@@ -31,16 +34,19 @@ Examples:
   drawmaps doom2.wad -b #1ecbe1
   drawmaps doom2.wad -b
   drawmaps doom2.wad --layers
+  drawmaps doom2.wad -j 0
 """
 
 import sys
 import os
+from concurrent.futures import ProcessPoolExecutor
 
 # --- Dependency check ---
 # Maps the import name to the pip package name (they differ for omgifol).
 _REQUIRED = {
     "omg": "omgifol",
     "PIL": "Pillow",
+    "numpy": "numpy",
 }
 _missing = []
 for _import_name, _pip_name in _REQUIRED.items():
@@ -55,6 +61,7 @@ if _missing:
 
 from omg import WAD, MapEditor
 from PIL import Image, ImageDraw
+import numpy as np
 
 # --- Linedef flag bits (classic Doom/Boom compatible) ---
 ML_SECRET = 0x0020  # "secret" line shows differently on automap in many ports
@@ -66,76 +73,60 @@ COL_SECRET    = (255, 255, 0, 255)      # secret lines (often yellow)
 COL_SPECIAL   = (0, 255, 0, 255)        # special/action lines (often green)
 COL_DEFAULT   = (255, 255, 255, 255)    # fallback (unused unless you expand rules)
 
+# Stable per-line-type layer index -> colour (index 0 unused):
+#   1 = one-sided (walls)
+#   2 = two-sided
+#   3 = secret
+#   4 = special/action
+LAYER_COLOURS = (None, COL_ONE_SIDED, COL_TWO_SIDED, COL_SECRET, COL_SPECIAL)
 
-def _linedef_flags(ld):
-    return int(getattr(ld, "flags", 0) or 0)
 
-
-def _linedef_special(ld):
-    # omgifol commonly uses .action; some libs use .special
-    return int(getattr(ld, "action", getattr(ld, "special", 0)) or 0)
-
-
-def colour_for_linedef(ld):
-    flags = _linedef_flags(ld)
-    special = _linedef_special(ld)
-
-    if flags & ML_SECRET:
-        return COL_SECRET
-    if special != 0:
-        return COL_SPECIAL
-
-    two_sided = bool(getattr(ld, "two_sided", False))
-    return COL_TWO_SIDED if two_sided else COL_ONE_SIDED
+def draw_thick_line(draw, p1x, p1y, p2x, p2y, color, thickness):
+    # One stroke wide enough to cover the old +/- (thickness - 1) pixel offsets
+    draw.line((p1x, p1y, p2x, p2y), fill=color, width=2 * thickness - 1)
 
 
-def layer_index_for_linedef(ld):
+def _new_canvas(w, h, bg_color):
     """
-    Stable per-line-type index:
-      1 = one-sided (walls)
-      2 = two-sided
-      3 = secret
-      4 = special/action
+    Paletted canvas: index 0 is the background, indices 1..4 are the
+    LAYER_COLOURS, so lines are drawn with their layer index as the fill.
+    A transparent background is saved via the PNG tRNS entry for index 0.
     """
-    flags = _linedef_flags(ld)
-    special = _linedef_special(ld)
-    two_sided = bool(getattr(ld, "two_sided", False))
-
-    if flags & ML_SECRET:
-        return 3
-    if special != 0:
-        return 4
-    if two_sided:
-        return 2
-    return 1
+    im = Image.new("P", (w, h), 0)
+    pal = list(bg_color[:3])
+    for colour in LAYER_COLOURS[1:]:
+        pal.extend(colour[:3])
+    im.putpalette(pal + [0] * (768 - len(pal)))
+    if bg_color[3] == 0:
+        im.info["transparency"] = 0
+    return im
 
 
-def draw_thick_line(draw, p1x, p1y, p2x, p2y, color, thickness):
-    draw.line((p1x, p1y, p2x, p2y), fill=color)
-    for i in range(1, thickness):
-        draw.line((p1x + i, p1y, p2x + i, p2y), fill=color)
-        draw.line((p1x - i, p1y, p2x - i, p2y), fill=color)
-        draw.line((p1x, p1y + i, p2x, p2y + i), fill=color)
-        draw.line((p1x, p1y - i, p2x, p2y - i), fill=color)
+def _save_png(im, path, png_compress):
+    # Big write buffer so the encoder's many small chunk writes reach the
+    # filesystem (and any on-access scanner) as a few large ones
+    with open(path, "wb", buffering=1024 * 1024) as fh:
+        im.save(fh, "PNG", compress_level=png_compress, optimize=False)
 
 
 def _compute_scaled_editor(wad, name, width):
     """
     Returns:
-      edit (MapEditor) with vertexes scaled to ints
+      edit (MapEditor)
+      xs, ys (int32 arrays of scaled vertex coords, y flipped)
       xmin, ymin, xmax, ymax (scaled ints)
     """
     xsize = width - 8
     edit = MapEditor(wad.maps[name])
 
-    xmin = ymin = 32767
-    xmax = ymax = -32768
+    n = len(edit.vertexes)
+    xs = np.fromiter((v.x for v in edit.vertexes), dtype=np.int32, count=n)
+    ys = np.fromiter((-v.y for v in edit.vertexes), dtype=np.int32, count=n)
 
-    for v in edit.vertexes:
-        xmin = min(xmin, v.x)
-        xmax = max(xmax, v.x)
-        ymin = min(ymin, -v.y)
-        ymax = max(ymax, -v.y)
+    xmin = int(xs.min(initial=32767))
+    xmax = int(xs.max(initial=-32768))
+    ymin = int(ys.min(initial=32767))
+    ymax = int(ys.max(initial=-32768))
 
     denom = (xmax - xmin) if (xmax - xmin) != 0 else 1
     scale = xsize / float(denom)
@@ -145,12 +136,11 @@ def _compute_scaled_editor(wad, name, width):
     ymin = int(ymin * scale)
     ymax = int(ymax * scale)
 
-    # Apply scaling (omgifol requires ints in vertex coords)
-    for v in edit.vertexes:
-        v.x = int(v.x * scale)
-        v.y = int(-v.y * scale)
+    # Scale to ints (truncating like int() did per vertex)
+    xs = (xs * scale).astype(np.int32)
+    ys = (ys * scale).astype(np.int32)
 
-    return edit, xmin, ymin, xmax, ymax
+    return edit, xs, ys, xmin, ymin, xmax, ymax
 
 
 def parse_background_color(color_str):
@@ -187,14 +177,15 @@ def parse_background_color(color_str):
         raise ValueError(f"Invalid hex color: {color_str} (must be valid hex digits)")
 
 
-def drawmap(wad, name, width, wad_basename, save_layers=False, thickness=1, bg_color=(0, 0, 0, 0)):
-    edit, xmin, ymin, xmax, ymax = _compute_scaled_editor(wad, name, width)
+def drawmap(wad, name, width, wad_basename, save_layers=False, thickness=1, bg_color=(0, 0, 0, 0),
+            png_compress=1):
+    edit, xs, ys, xmin, ymin, xmax, ymax = _compute_scaled_editor(wad, name, width)
 
     w = (xmax - xmin) + 8
     h = (ymax - ymin) + 8
 
     # All-lines image
-    im_all = Image.new("RGBA", (w, h), bg_color)
+    im_all = _new_canvas(w, h, bg_color)
     draw_all = ImageDraw.Draw(im_all)
 
     # Optional per-type layer images
@@ -202,34 +193,59 @@ def drawmap(wad, name, width, wad_basename, save_layers=False, thickness=1, bg_c
     layer_draws = None
     if save_layers:
         # 1..4 used; index 0 unused for convenience
-        layer_imgs = [None] + [Image.new("RGBA", (w, h), bg_color) for _ in range(4)]
+        layer_imgs = [None] + [_new_canvas(w, h, bg_color) for _ in range(4)]
         layer_draws = [None] + [ImageDraw.Draw(layer_imgs[i]) for i in range(1, 5)]
 
-    # Draw one-sided first then two-sided last (helps mimic automap emphasis)
-    edit.linedefs.sort(key=lambda ld: bool(getattr(ld, "two_sided", False)))
+    # Resolve vertex coords once, then bucket segments by line type.
+    # Drawing the buckets in order 1..4 puts one-sided walls first and
+    # two-sided after them (helps mimic automap emphasis), with secret and
+    # special lines on top.
+    coords = np.stack([xs - xmin + 4, ys - ymin + 4], axis=1)
+
+    linedefs = edit.linedefs
+    n = len(linedefs)
+    vx_a = np.fromiter((ld.vx_a for ld in linedefs), dtype=np.intp, count=n)
+    vx_b = np.fromiter((ld.vx_b for ld in linedefs), dtype=np.intp, count=n)
+    flags = np.fromiter((int(getattr(ld, "flags", 0) or 0) for ld in linedefs), dtype=np.int32, count=n)
+    # omgifol commonly uses .action; some libs use .special
+    specials = np.fromiter((int(getattr(ld, "action", getattr(ld, "special", 0)) or 0) for ld in linedefs),
+                           dtype=np.int32, count=n)
+    two_sided = np.fromiter((bool(getattr(ld, "two_sided", False)) for ld in linedefs), dtype=bool, count=n)
 
-    for ld in edit.linedefs:
-        p1x = edit.vertexes[ld.vx_a].x - xmin + 4
-        p1y = edit.vertexes[ld.vx_a].y - ymin + 4
-        p2x = edit.vertexes[ld.vx_b].x - xmin + 4
-        p2y = edit.vertexes[ld.vx_b].y - ymin + 4
+    layer_ids = np.where(flags & ML_SECRET, 3, np.where(specials != 0, 4, np.where(two_sided, 2, 1)))
+    segs = np.concatenate([coords[vx_a], coords[vx_b]], axis=1)
+    segs_by_layer = {idx: segs[layer_ids == idx].tolist() for idx in (1, 2, 3, 4)}
 
-        color = colour_for_linedef(ld)
+    for idx in (1, 2, 3, 4):
+        for p1x, p1y, p2x, p2y in segs_by_layer[idx]:
+            # Draw into combined map
+            draw_thick_line(draw_all, p1x, p1y, p2x, p2y, idx, thickness)
 
-        # Draw into combined map
-        draw_thick_line(draw_all, p1x, p1y, p2x, p2y, color, thickness)
-
-        # Draw into per-type layer map (if enabled)
-        if save_layers:
-            idx = layer_index_for_linedef(ld)
-            draw_thick_line(layer_draws[idx], p1x, p1y, p2x, p2y, color, thickness)
+            # Draw into per-type layer map (if enabled)
+            if save_layers:
+                draw_thick_line(layer_draws[idx], p1x, p1y, p2x, p2y, idx, thickness)
 
     del draw_all
-    im_all.save(f"{wad_basename}-{name}.png", "PNG")
+    _save_png(im_all, f"{wad_basename}-{name}.png", png_compress)
 
     if save_layers:
         for i in range(1, 5):
-            layer_imgs[i].save(f"{wad_basename}-{name}_layer{i}.png", "PNG")
+            _save_png(layer_imgs[i], f"{wad_basename}-{name}_layer{i}.png", png_compress)
+
+
+# --- Worker process state for --jobs ---
+# Each worker loads the WAD once; omgifol WAD objects aren't sent between processes.
+_worker_wad = None
+
+
+def _init_worker(source):
+    global _worker_wad
+    _worker_wad = WAD()
+    _worker_wad.from_file(source)
+
+
+def _drawmap_in_worker(name, width, wad_basename, kwargs):
+    drawmap(_worker_wad, name, width, wad_basename, **kwargs)
 
 
 def show_help():
@@ -258,6 +274,8 @@ def main(argv):
     save_layers = False
     thickness = 1
     bg_color = (0, 0, 0, 0)  # Transparent by default
+    png_compress = 1
+    jobs = 1
 
     # Parse arguments
     i = 2
@@ -308,6 +326,32 @@ def main(argv):
         elif arg == "--layers":
             save_layers = True
             i += 1
+        elif arg in ("-j", "--jobs"):
+            if i + 1 >= len(argv):
+                print(f"Error: {arg} requires a value")
+                return 1
+            try:
+                jobs = int(argv[i + 1])
+            except ValueError:
+                print(f"Error: {arg} requires a numeric value")
+                return 1
+            if jobs < 0:
+                print(f"Error: {arg} must be 0 or more")
+                return 1
+            i += 2
+        elif arg == "--png-compress":
+            if i + 1 >= len(argv):
+                print(f"Error: {arg} requires a value")
+                return 1
+            try:
+                png_compress = int(argv[i + 1])
+            except ValueError:
+                print(f"Error: {arg} requires a numeric value")
+                return 1
+            if not 0 <= png_compress <= 9:
+                print(f"Error: {arg} must be between 0 and 9")
+                return 1
+            i += 2
         else:
             print(f"Error: Unknown option: {arg}")
             show_help()
@@ -353,6 +397,13 @@ def main(argv):
             return 2
 
     # Draw all matched maps
+    draw_kwargs = dict(save_layers=save_layers, thickness=thickness, bg_color=bg_color, png_compress=png_compress)
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(map_names))
+
+    pool = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(source,)) if jobs > 1 else None
+    pending = []
     for name in map_names:
         status = f"Drawing {name} ({width}px"
         if thickness > 1:
@@ -366,12 +417,24 @@ def main(argv):
             status += ", with layers"
         status += ")"
         print(status)
-        
+
+        if pool is not None:
+            pending.append((name, pool.submit(_drawmap_in_worker, name, width, wad_basename, draw_kwargs)))
+            continue
+
         try:
-            drawmap(wad, name, width, wad_basename, save_layers=save_layers, thickness=thickness, bg_color=bg_color)
+            drawmap(wad, name, width, wad_basename, **draw_kwargs)
         except Exception as e:
             print(f"Error drawing {name}: {e}")
 
+    if pool is not None:
+        for name, fut in pending:
+            try:
+                fut.result()
+            except Exception as e:
+                print(f"Error drawing {name}: {e}")
+        pool.shutdown()
+
     print(f"\nDone! Generated {len(map_names)} map(s)")
     return 0
 
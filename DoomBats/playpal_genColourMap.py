@@ -2,7 +2,13 @@
 
 import sys
 import os
-from math import sqrt
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
 
@@ -101,33 +107,70 @@ def best_color(r, g, b, palette):
 
     return best_index
 
+def nearest(query, pal_arr):
+    """best_color for every row of an (N, 3) query against an int32 (256, 3) palette"""
+    # |q - p|^2 = |q|^2 - 2 q.p + |p|^2: one matmul instead of an (N, 256, 3) temp.
+    # Every term is a small integer, so float64 stays exact (ties included)
+    q = query.astype(np.float64)
+    p = pal_arr.astype(np.float64)
+    qq = np.einsum("ij,ij->i", q, q)
+    dist = qq[:, None] - 2.0 * (q @ p.T) + np.einsum("ij,ij->i", p, p)[None, :]
+    idx = dist.argmin(1)
+    # best_color only accepts a match closer than 2*(r*r + g*g + b*b)
+    return np.where(dist[np.arange(len(query)), idx] < qq * 2, idx, 0)
+
+if njit is not None:
+    @njit(cache=True)
+    def _nearest_kernel(query, pal_arr):
+        """Numba version of nearest(): best_color's own scan per row, compiled once and cached"""
+        n = query.shape[0]
+        out = np.empty(n, dtype=np.int64)
+        for i in range(n):
+            r = query[i, 0]
+            g = query[i, 1]
+            b = query[i, 2]
+            best_dist = (r * r + g * g + b * b) * 2
+            best_index = 0
+            for j in range(pal_arr.shape[0]):
+                dr = r - pal_arr[j, 0]
+                dg = g - pal_arr[j, 1]
+                db = b - pal_arr[j, 2]
+                dist = dr * dr + dg * dg + db * db
+                if dist < best_dist:
+                    best_dist = dist
+                    best_index = j
+                    if dist == 0:
+                        break
+            out[i] = best_index
+        return out
+else:
+    _nearest_kernel = nearest
+
+def nearest_distinct(query, pal_arr):
+    """nearest(), but each distinct colour of the query is only matched once"""
+    # Pack RGB into one 24-bit key: darker light levels collapse many colours together
+    keys = (query[:, 0] << 16) | (query[:, 1] << 8) | query[:, 2]
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    colours = np.stack([uniq >> 16, (uniq >> 8) & 0xFF, uniq & 0xFF], axis=1)
+    return _nearest_kernel(colours, pal_arr)[inverse.ravel()]
+
 def build_colormap(palette):
-    colormap = []
-
-    # Normal light levels
-    for l in range(NUMLIGHTS):
-        row = []
-        for r, g, b in palette:
-            nr = (r * (NUMLIGHTS - l) + NUMLIGHTS // 2) // NUMLIGHTS
-            ng = (g * (NUMLIGHTS - l) + NUMLIGHTS // 2) // NUMLIGHTS
-            nb = (b * (NUMLIGHTS - l) + NUMLIGHTS // 2) // NUMLIGHTS
-            idx = best_color(nr, ng, nb, palette)
-            row.append(idx)
-        colormap.append(row)
-
-    # Invulnerability row
-    invuln = []
-    for r, g, b in palette:
-        fr = r / 255.0
-        fg = g / 255.0
-        fb = b / 255.0
-        gray = fr * 0.299 + fg * 0.587 + fb * 0.144
-        gray = 1.0 - gray
-        gv = int(gray * 255)
-        idx = best_color(gv, gv, gv, palette)
-        invuln.append(idx)
-
-    colormap.append(invuln)
+    pal_arr = np.asarray(palette, dtype=np.int32)
+
+    # Normal light levels: darken the palette for all 32 levels as one
+    # (32*256, 3) array and match it against the palette in a single pass
+    levels = np.arange(NUMLIGHTS)[:, None, None]
+    darkened = (pal_arr[None] * (NUMLIGHTS - levels) + NUMLIGHTS // 2) // NUMLIGHTS
+    colormap = nearest_distinct(darkened.reshape(-1, 3), pal_arr).reshape(NUMLIGHTS, 256).tolist()
+
+    # Invulnerability row: inverted gray of every entry, matched in one pass.
+    # Bright colours invert slightly below zero, so these skip nearest_distinct's
+    # packed keys and go straight to the matcher
+    f = pal_arr / 255.0
+    gray = f[:, 0] * 0.299 + f[:, 1] * 0.587 + f[:, 2] * 0.144
+    gray = 1.0 - gray
+    gv = (gray * 255).astype(np.int32)
+    colormap.append(_nearest_kernel(np.stack([gv, gv, gv], axis=1), pal_arr).tolist())
 
     # Pure black row
     black_row = [best_color(0, 0, 0, palette)] * 256
@@ -138,18 +181,11 @@ def build_colormap(palette):
 def write_png(colormap, palette, outpath):
     from PIL import Image
 
-    h = len(colormap)
-    w = 256
-
-    img = Image.new("RGB", (w, h))
-    px = img.load()
-
-    for y in range(h):
-        for x in range(w):
-            idx = colormap[y][x]
-            px[x, y] = palette[idx]
+    # Look every entry up in the palette at once: (rows, 256) indices -> (rows, 256, 3) RGB
+    pal_arr = np.asarray(palette, dtype=np.uint8)
+    rgb = pal_arr[np.asarray(colormap, dtype=np.intp)]
 
-    img.save(outpath)
+    Image.fromarray(rgb, "RGB").save(outpath)
 
 def main():
     if len(sys.argv) != 3:
@@ -2,7 +2,8 @@
 
 import sys
 import os
-from math import sqrt
+
+import numpy as np
 
 PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
 
@@ -51,27 +52,18 @@ def extract_palette(path, kind):
     if kind in ("playpal14PNG", "playpal1PNG", "sladeStylePNG"):
         from PIL import Image
         with Image.open(path) as im:
-            im = im.convert("RGBA")
-            w, h = im.size
+            arr = np.asarray(im.convert("RGBA"))[:, :, :3]
+            h, w = arr.shape[:2]
 
             if kind in ("playpal14PNG", "playpal1PNG"):
-                pal = []
-                for x in range(256):
-                    r, g, b, _ = im.getpixel((x, 0))
-                    pal.append((r, g, b))
-                return pal
+                return list(map(tuple, arr[0, :256].tolist()))
 
             if kind == "sladeStylePNG":
                 cell_w = w // 16
                 cell_h = h // 16
-                pal = []
-                for row in range(16):
-                    for col in range(16):
-                        cx = col * cell_w + cell_w // 2
-                        cy = row * cell_h + cell_h // 2
-                        r, g, b, _ = im.getpixel((cx, cy))
-                        pal.append((r, g, b))
-                return pal
+                ys = np.arange(16) * cell_h + cell_h // 2
+                xs = np.arange(16) * cell_w + cell_w // 2
+                return list(map(tuple, arr[ys[:, None], xs[None, :]].reshape(256, 3).tolist()))
 
     with open(path, "rb") as f:
         data = f.read()
@@ -88,6 +80,10 @@ def best_color(r, g, b, palette):
     best_dist = (r*r + g*g + b*b) * 2
     best_index = 0
 
+    # Nothing beats a zero starting distance, so black always maps to 0
+    if best_dist == 0:
+        return best_index
+
     for i, (pr, pg, pb) in enumerate(palette):
         dr = r - pr
         dg = g - pg
@@ -101,53 +97,43 @@ def best_color(r, g, b, palette):
 
     return best_index
 
+def nearest(query, pal_arr):
+    """best_color for every row of an (N, 3) query against an int32 (256, 3) palette"""
+    diff = pal_arr[None, :, :] - query[:, None, :]
+    dist = np.einsum("ijk,ijk->ij", diff, diff)
+    idx = dist.argmin(1)
+    # best_color only accepts a match closer than 2*(r*r + g*g + b*b)
+    limit = np.einsum("ij,ij->i", query, query) * 2
+    return np.where(dist[np.arange(len(query)), idx] < limit, idx, 0)
+
 def build_colormap_no_lighting(palette):
-    colormap = []
+    colormap = np.zeros((TOTAL_ROWS, 256), dtype=np.uint8)
 
-    # Full brightness row (no darkening)
-    full_bright_row = []
-    for i in range(256):
-        full_bright_row.append(i)
-    
-    # Repeat the full brightness row 32 times (rows 0-31)
-    for l in range(NUMLIGHTS):
-        colormap.append(full_bright_row[:])
+    # Full brightness row (no darkening), repeated 32 times (rows 0-31)
+    colormap[:NUMLIGHTS, :] = np.arange(256, dtype=np.uint8)[None, :]
 
     # Invulnerability row (row 32)
-    invuln = []
-    for r, g, b in palette:
-        fr = r / 255.0
-        fg = g / 255.0
-        fb = b / 255.0
-        gray = fr * 0.299 + fg * 0.587 + fb * 0.144
-        gray = 1.0 - gray
-        gv = int(gray * 255)
-        idx = best_color(gv, gv, gv, palette)
-        invuln.append(idx)
-
-    colormap.append(invuln)
+    pal_arr = np.asarray(palette, dtype=np.int32)
+    f = pal_arr / 255.0
+    gray = f[:, 0] * 0.299 + f[:, 1] * 0.587 + f[:, 2] * 0.144
+    gray = 1.0 - gray
+    gv = (gray * 255).astype(np.int32)
+    colormap[GRAYCOLORMAP, :] = nearest(np.stack([gv, gv, gv], axis=1), pal_arr)
 
     # Pure black row (row 33)
-    black_row = [best_color(0, 0, 0, palette)] * 256
-    colormap.append(black_row)
+    colormap[BLACKROW, :] = best_color(0, 0, 0, palette)
 
     return colormap
 
-def write_png(colormap, palette, outpath):
+def write_png(colormap, palette, outpath, compress_level=1):
     from PIL import Image
 
-    h = len(colormap)
-    w = 256
-
-    img = Image.new("RGB", (w, h))
-    px = img.load()
-
-    for y in range(h):
-        for x in range(w):
-            idx = colormap[y][x]
-            px[x, y] = palette[idx]
+    # Colormap entries are palette indices: write them as an indexed PNG
+    pal_flat = np.asarray(palette, dtype=np.uint8).tobytes()
 
-    img.save(outpath)
+    img = Image.fromarray(colormap, "P")
+    img.putpalette(pal_flat + b"\x00" * (768 - len(pal_flat)))
+    img.save(outpath, compress_level=compress_level)
 
 def main():
     if len(sys.argv) != 3:
@@ -2,8 +2,10 @@
 from __future__ import annotations
 
 import argparse
+import mmap
 from pathlib import Path
 from PIL import Image
+import numpy as np
 
 COLORS = 256
 BYTES_PER_COLOR = 3
@@ -11,38 +13,45 @@ BYTES_PER_PALETTE = COLORS * BYTES_PER_COLOR  # 768
 GRID = 16  # 16x16 = 256
 
 
-def pal_bytes_to_strip_png(data: bytes, out_path: Path, scale: int = 1) -> None:
-    if len(data) == 0:
+def _check_pal_size(size: int) -> None:
+    if size == 0:
         raise ValueError("Input .pal file is empty.")
-    if len(data) % BYTES_PER_PALETTE != 0:
+    if size % BYTES_PER_PALETTE != 0:
         raise ValueError(
-            f"Invalid .pal size: {len(data)} bytes. "
+            f"Invalid .pal size: {size} bytes. "
             f"Expected multiple of {BYTES_PER_PALETTE} (256*3) for raw Doom palette data."
         )
 
+
+def pal_bytes_to_strip_png(data: bytes | np.ndarray, out_path: Path, scale: int = 1, compress_level: int = 1) -> None:
+    _check_pal_size(len(data))
+
     palettes = len(data) // BYTES_PER_PALETTE
 
     # 256 x N image: x=color index, y=palette index
-    img = Image.new("RGB", (COLORS, palettes))
-    px = img.load()
-
-    i = 0
-    for p in range(palettes):
-        for c in range(COLORS):
-            r = data[i]
-            g = data[i + 1]
-            b = data[i + 2]
-            px[c, p] = (r, g, b)
-            i += 3
+    arr = np.frombuffer(data, dtype=np.uint8).reshape(palettes, COLORS, 3)
+    img = Image.fromarray(arr, "RGB")
 
     if scale > 1:
         img = img.resize((COLORS * scale, palettes * scale), Image.NEAREST)
 
-    img.save(out_path)
+    img.save(out_path, compress_level=compress_level)
     print(f"Read {palettes} palette(s) from raw .pal ({len(data)} bytes)")
     print(f"Wrote {out_path} ({img.size[0]}x{img.size[1]})")
 
 
+def pal_file_to_strip_png(in_path: Path, out_path: Path, scale: int = 1, compress_level: int = 1) -> None:
+    """Memory-maps the .pal file so NumPy views it without reading it into a bytes object."""
+    _check_pal_size(in_path.stat().st_size)  # also rejects empty files, which can't be mapped
+
+    with open(in_path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        pal_bytes_to_strip_png(np.frombuffer(mm, dtype=np.uint8), out_path, scale=scale, compress_level=compress_level)
+        # Not closed on error: the traceback still holds the NumPy view, and
+        # closing under it would raise BufferError over the real exception
+        mm.close()
+
+
 def _normalize_strip_png(img: Image.Image) -> Image.Image:
     """
     Accepts a palette strip PNG:
@@ -80,22 +89,15 @@ def _grid16x16_to_strip(img: Image.Image) -> Image.Image:
     cell_w = w // GRID
     cell_h = h // GRID
 
-    out = Image.new("RGB", (COLORS, 1))
-    out_px = out.load()
-    px = img.load()
-
-    idx = 0
-    for gy in range(GRID):
-        cy = gy * cell_h + cell_h // 2
-        for gx in range(GRID):
-            cx = gx * cell_w + cell_w // 2
-            out_px[idx, 0] = px[cx, cy]
-            idx += 1
+    a = np.asarray(img)
+    ys = np.arange(GRID) * cell_h + cell_h // 2
+    xs = np.arange(GRID) * cell_w + cell_w // 2
+    samples = a[ys[:, None], xs[None, :], :]  # (16, 16, 3), row-major = colour index
 
-    return out
+    return Image.fromarray(samples.reshape(1, COLORS, 3), "RGB")
 
 
-def png_to_strip_png(in_path: Path, out_path: Path, scale: int = 1) -> None:
+def png_to_strip_png(in_path: Path, out_path: Path, scale: int = 1, compress_level: int = 1) -> None:
     img = Image.open(in_path).convert("RGB")
     w, h = img.size
 
@@ -115,7 +117,7 @@ def png_to_strip_png(in_path: Path, out_path: Path, scale: int = 1) -> None:
     if scale > 1:
         strip = strip.resize((strip.size[0] * scale, strip.size[1] * scale), Image.NEAREST)
 
-    strip.save(out_path)
+    strip.save(out_path, compress_level=compress_level)
     print(f"Read palette PNG: {in_path} ({w}x{h})")
     print(f"Wrote {out_path} ({strip.size[0]}x{strip.size[1]})")
 
@@ -127,6 +129,8 @@ def main() -> None:
     ap.add_argument("input", type=Path, help="Input: playpal.pal / pal0.pal (raw) OR pal0.png (grid/strip)")
     ap.add_argument("output_png", type=Path, help="Output PNG (palette strip 256xN, optionally scaled)")
     ap.add_argument("--scale", type=int, default=1, help="Scale output up with nearest-neighbor (default: 1)")
+    ap.add_argument("--png-compress", type=int, default=1, choices=range(10), metavar="0-9",
+                    help="PNG zlib compression level (default: 1, fast)")
     args = ap.parse_args()
 
     in_path = args.input
@@ -134,9 +138,9 @@ def main() -> None:
 
     ext = in_path.suffix.lower()
     if ext == ".pal":
-        pal_bytes_to_strip_png(in_path.read_bytes(), out_path, scale=args.scale)
+        pal_file_to_strip_png(in_path, out_path, scale=args.scale, compress_level=args.png_compress)
     elif ext == ".png":
-        png_to_strip_png(in_path, out_path, scale=args.scale)
+        png_to_strip_png(in_path, out_path, scale=args.scale, compress_level=args.png_compress)
     else:
         raise ValueError("Unsupported input type. Use a .pal or .png file.")
 
@@ -127,6 +127,8 @@ echo REQUIREMENTS:
 echo   - Python 3.6 or higher
 echo   - wadTXext.py must be in PATH or same directory
 echo   - Pillow library for PNG export: pip install Pillow
+echo   - numpy library: pip install numpy
+echo   - numba (optional, faster patch decoding): pip install numba
 echo.
 
 :end
@@ -16,6 +16,11 @@ try:
 except ImportError:
     missing_deps.append('Pillow')
 
+try:
+    import numpy as np
+except ImportError:
+    missing_deps.append('numpy')
+
 if missing_deps:
     print("ERROR: Missing required dependencies!")
     print(f"Missing: {', '.join(missing_deps)}")
@@ -23,12 +28,49 @@ if missing_deps:
     print(f"python -m pip install --upgrade pip && python -m pip install {' '.join(missing_deps)}")
     sys.exit(1)
 
+import mmap
+import re
 import struct
 import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import List, Set, Tuple, Dict, Optional
 from dataclasses import dataclass
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Fixed-size binary records (little-endian), compiled once
+_WAD_HEADER = struct.Struct('<4sII')        # identification, numlumps, infotableofs
+_LUMP_NAME = struct.Struct('8s')            # PNAMES entry
+_TEXTURE_HEADER = struct.Struct('<8sIHHIH') # name, masked, width, height, columndirectory, patchcount
+_TEXTURE_PATCH = struct.Struct('<hhHHH')    # originx, originy, patch, stepdir, colormap
+_PICTURE_HEADER = struct.Struct('<HHhh')    # width, height, leftoffset, topoffset
+
+# UDMF TEXTMAP: comments, sidedef/sector blocks and the texture keys read from them
+_UDMF_COMMENT = re.compile(r'//[^\n]*|/\*.*?\*/', re.DOTALL)
+_UDMF_SIDEDEF = re.compile(r'\bsidedef\s*\{([^}]*)\}', re.IGNORECASE)
+_UDMF_SECTOR = re.compile(r'\bsector\s*\{([^}]*)\}', re.IGNORECASE)
+_UDMF_WALL_TEXTURE = re.compile(r'\btexture(?:top|middle|bottom)\s*=\s*"([^"]*)"', re.IGNORECASE)
+_UDMF_FLAT = re.compile(r'\btexture(?:floor|ceiling)\s*=\s*"([^"]*)"', re.IGNORECASE)
+
+# WAD directory entry and on-disk map lump records (little-endian), read
+# straight from the file bytes
+WAD_DIR_DTYPE = np.dtype([('filepos', '<u4'), ('size', '<u4'), ('name', 'S8')])
+SIDEDEF_DTYPE = np.dtype([
+    ('xoffset', '<i2'), ('yoffset', '<i2'),
+    ('upper', 'S8'), ('lower', 'S8'), ('middle', 'S8'),
+    ('sector', '<u2'),
+])
+SECTOR_DTYPE = np.dtype([
+    ('floorheight', '<i2'), ('ceilingheight', '<i2'),
+    ('floor', 'S8'), ('ceiling', 'S8'),
+    ('light', '<i2'), ('special', '<u2'), ('tag', '<u2'),
+])
+
 
 @dataclass
 class WadHeader:
@@ -71,65 +113,80 @@ class WadReader:
     def __init__(self, filepath: str):
         self.filepath = filepath
         self.file = None
+        self.mm = None
+        self.view = None
         self.header = None
         self.lumps: List[LumpInfo] = []
         self.lump_dict: Dict[str, LumpInfo] = {}
+        self.lump_dir: Optional[np.ndarray] = None
         
     def __enter__(self):
         self.file = open(self.filepath, 'rb')
+        # Map the whole file once; lumps are handed out as zero-copy memoryview slices
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mm)
         self._read_header()
         self._read_directory()
         return self
         
     def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.view is not None:
+            self.view.release()
+        if self.mm is not None:
+            try:
+                self.mm.close()
+            except BufferError:
+                # Lump views are still referenced; the mapping goes away with the last one
+                pass
         if self.file:
             self.file.close()
     
     def _read_header(self):
         """Read WAD header"""
-        self.file.seek(0)
-        data = self.file.read(12)
+        identification, numlumps, infotableofs = _WAD_HEADER.unpack_from(self.view, 0)
         
-        identification = data[0:4].decode('ascii')
-        numlumps = struct.unpack('<I', data[4:8])[0]
-        infotableofs = struct.unpack('<I', data[8:12])[0]
-        
-        self.header = WadHeader(identification, numlumps, infotableofs)
+        self.header = WadHeader(identification.decode('ascii'), numlumps, infotableofs)
     
     def _read_directory(self):
         """Read WAD directory/lump table"""
-        self.file.seek(self.header.infotableofs)
+        # The whole directory in one structured array (copied out of the mapping,
+        # so close() never sees a live export); S8 drops the NUL padding
+        start = self.header.infotableofs
+        end = start + self.header.numlumps * WAD_DIR_DTYPE.itemsize
+        if end > len(self.mm):
+            raise struct.error("WAD directory runs past the end of the file")
+        self.lump_dir = np.frombuffer(self.mm[start:end], dtype=WAD_DIR_DTYPE)
         
-        for i in range(self.header.numlumps):
-            data = self.file.read(16)
-            filepos = struct.unpack('<I', data[0:4])[0]
-            size = struct.unpack('<I', data[4:8])[0]
-            name = data[8:16].rstrip(b'\x00').decode('ascii', errors='ignore')
-            
-            lump = LumpInfo(filepos, size, name)
-            self.lumps.append(lump)
-            self.lump_dict[name.upper()] = lump
+        names = [name.decode('ascii', errors='ignore') for name in self.lump_dir['name'].tolist()]
+        self.lumps = list(map(LumpInfo, self.lump_dir['filepos'].tolist(), self.lump_dir['size'].tolist(), names))
+        # Later lumps override earlier ones with the same name
+        self.lump_dict = {lump.name.upper(): lump for lump in self.lumps}
     
     def find_lump(self, name: str) -> Optional[LumpInfo]:
         """Find a lump by name"""
-        return self.lump_dict.get(name.upper())
+        # Keys are upper case and so are the names the parsers hand us; only
+        # a miss pays for upper()
+        lump = self.lump_dict.get(name)
+        if lump is None:
+            lump = self.lump_dict.get(name.upper())
+        return lump
     
-    def read_lump(self, lump: LumpInfo) -> bytes:
-        """Read lump data"""
+    def read_lump(self, lump: LumpInfo) -> memoryview:
+        """Lump data as a read-only view into the mapped file"""
         if lump.size == 0:
             return b''
-        self.file.seek(lump.filepos)
-        return self.file.read(lump.size)
+        return self.view[lump.filepos:lump.filepos + lump.size]
     
     def find_map_index(self, mapname: str) -> int:
         """Find the index of a map marker lump"""
-        mapname = mapname.upper()
-        for i, lump in enumerate(self.lumps):
-            if lump.name == mapname:
-                return i
-        return -1
+        try:
+            key = mapname.upper().encode('ascii')
+        except UnicodeEncodeError:
+            return -1
+        hits = np.flatnonzero(self.lump_dir['name'] == key)
+        return int(hits[0]) if hits.size else -1
     
-    def read_lump_by_name(self, name: str) -> Optional[bytes]:
+    def read_lump_by_name(self, name: str) -> Optional[memoryview]:
         """Read lump data by name"""
         lump = self.find_lump(name)
         if lump:
@@ -137,6 +194,15 @@ class WadReader:
         return None
 
 
+def _distinct_names(*columns: np.ndarray) -> Set[str]:
+    """Upper-cased names from S8 name columns, decoding each distinct name once"""
+    # Deduplicate on the raw bytes (S8 drops the NUL padding) and drop empty
+    # names before anything is decoded
+    names = np.unique(np.concatenate(columns))
+    names = names[names != b'']
+    return {name.decode('ascii', errors='ignore').upper() for name in names.tolist()} - {''}
+
+
 class MapParser:
     """Parse Doom map data to find used textures and flats"""
     
@@ -185,75 +251,37 @@ class MapParser:
     def _parse_sidedefs(self, lump: LumpInfo):
         """Parse SIDEDEFS to extract wall textures"""
         data = self.wad.read_lump(lump)
-        num_sidedefs = len(data) // 30
+        sidedefs = np.frombuffer(data, dtype=SIDEDEF_DTYPE, count=len(data) // SIDEDEF_DTYPE.itemsize)
         
-        for i in range(num_sidedefs):
-            offset = i * 30
-            sidedef = data[offset:offset + 30]
-            
-            upper_tex = sidedef[4:12].rstrip(b'\x00').decode('ascii', errors='ignore')
-            lower_tex = sidedef[12:20].rstrip(b'\x00').decode('ascii', errors='ignore')
-            middle_tex = sidedef[20:28].rstrip(b'\x00').decode('ascii', errors='ignore')
-            
-            for tex in [upper_tex, lower_tex, middle_tex]:
-                if tex and tex != '-':
-                    self.textures.add(tex.upper())
+        # '-' means no texture on that part of the wall
+        self.textures.update(_distinct_names(sidedefs['upper'], sidedefs['lower'], sidedefs['middle']) - {'-'})
     
     def _parse_sectors(self, lump: LumpInfo):
         """Parse SECTORS to extract flats"""
         data = self.wad.read_lump(lump)
-        num_sectors = len(data) // 26
+        sectors = np.frombuffer(data, dtype=SECTOR_DTYPE, count=len(data) // SECTOR_DTYPE.itemsize)
         
-        for i in range(num_sectors):
-            offset = i * 26
-            sector = data[offset:offset + 26]
-            
-            floor_flat = sector[4:12].rstrip(b'\x00').decode('ascii', errors='ignore')
-            ceiling_flat = sector[12:20].rstrip(b'\x00').decode('ascii', errors='ignore')
-            
-            if floor_flat:
-                self.flats.add(floor_flat.upper())
-            if ceiling_flat:
-                self.flats.add(ceiling_flat.upper())
+        self.flats.update(_distinct_names(sectors['floor'], sectors['ceiling']))
     
     def _parse_udmf(self, map_index: int):
         """Parse UDMF format map"""
         textmap_lump = self.wad.lumps[map_index + 1]
         data = self.wad.read_lump(textmap_lump)
-        text = data.decode('ascii', errors='ignore')
+        text = str(data, 'ascii', errors='ignore')
         
-        lines = text.split('\n')
-        in_sidedef = False
-        in_sector = False
+        # Drop comments (editors write "sidedef // 0"), then pull the texture keys
+        # out of each sidedef/sector block in a few C-level regex scans
+        text = _UDMF_COMMENT.sub('', text)
         
-        for line in lines:
-            line = line.strip()
-            
-            if line == 'sidedef':
-                in_sidedef = True
-                in_sector = False
-            elif line == 'sector':
-                in_sector = True
-                in_sidedef = False
-            elif line == '}':
-                in_sidedef = False
-                in_sector = False
-            elif in_sidedef:
-                if '=' in line:
-                    key, value = line.split('=', 1)
-                    key = key.strip()
-                    value = value.strip(' ";')
-                    
-                    if key in ['texturetop', 'texturemiddle', 'texturebottom'] and value != '-':
-                        self.textures.add(value.upper())
-            elif in_sector:
-                if '=' in line:
-                    key, value = line.split('=', 1)
-                    key = key.strip()
-                    value = value.strip(' ";')
-                    
-                    if key in ['texturefloor', 'textureceiling']:
-                        self.flats.add(value.upper())
+        for body in _UDMF_SIDEDEF.findall(text):
+            for value in _UDMF_WALL_TEXTURE.findall(body):
+                if value and value != '-':
+                    self.textures.add(value.upper())
+        
+        for body in _UDMF_SECTOR.findall(text):
+            for value in _UDMF_FLAT.findall(body):
+                if value:
+                    self.flats.add(value.upper())
 
 
 class TextureManager:
@@ -261,7 +289,8 @@ class TextureManager:
     
     def __init__(self, wad: WadReader):
         self.wad = wad
-        self.textures: Dict[str, TextureDefinition] = {}
+        self.textures: Dict[str, TextureDefinition] = {}  # decoded so far
+        self._texture_entries: Dict[str, tuple] = {}  # name -> (TEXTUREx lump, entry offset)
         self.pnames: List[str] = []
         self._load_pnames()
         self._load_textures()
@@ -272,50 +301,54 @@ class TextureManager:
         if not pnames_data:
             return
         
-        num_patches = struct.unpack('<I', pnames_data[0:4])[0]
+        num_patches = struct.unpack_from('<I', pnames_data, 0)[0]
         
-        for i in range(num_patches):
-            offset = 4 + (i * 8)
-            name = pnames_data[offset:offset + 8].rstrip(b'\x00').decode('ascii', errors='ignore')
+        # A short lump gives empty names for the missing entries, as before
+        names = bytes(pnames_data[4:4 + num_patches * 8]).ljust(num_patches * 8, b'\x00')
+        for (name,) in _LUMP_NAME.iter_unpack(names):
+            name = name.rstrip(b'\x00').decode('ascii', errors='ignore')
             self.pnames.append(name.upper())
     
     def _load_textures(self):
-        """Load TEXTURE1 and TEXTURE2 lumps"""
+        """Index TEXTURE1 and TEXTURE2 by name; entries are decoded on first lookup"""
         for texture_lump_name in ['TEXTURE1', 'TEXTURE2']:
             texture_data = self.wad.read_lump_by_name(texture_lump_name)
             if not texture_data:
                 continue
             
-            num_textures = struct.unpack('<I', texture_data[0:4])[0]
+            num_textures = struct.unpack_from('<I', texture_data, 0)[0]
+            texture_offsets = struct.unpack_from(f'<{num_textures}I', texture_data, 4)
             
-            for i in range(num_textures):
-                offset_pos = 4 + (i * 4)
-                texture_offset = struct.unpack('<I', texture_data[offset_pos:offset_pos + 4])[0]
-                
-                tex_data = texture_data[texture_offset:]
-                
-                name = tex_data[0:8].rstrip(b'\x00').decode('ascii', errors='ignore').upper()
-                width = struct.unpack('<H', tex_data[12:14])[0]
-                height = struct.unpack('<H', tex_data[14:16])[0]
-                patch_count = struct.unpack('<H', tex_data[20:22])[0]
-                
-                patches = []
-                for p in range(patch_count):
-                    patch_offset = 22 + (p * 10)
-                    originx = struct.unpack('<h', tex_data[patch_offset:patch_offset + 2])[0]
-                    originy = struct.unpack('<h', tex_data[patch_offset + 2:patch_offset + 4])[0]
-                    patch_num = struct.unpack('<H', tex_data[patch_offset + 4:patch_offset + 6])[0]
-                    stepdir = struct.unpack('<H', tex_data[patch_offset + 6:patch_offset + 8])[0]
-                    colormap = struct.unpack('<H', tex_data[patch_offset + 8:patch_offset + 10])[0]
-                    
-                    patches.append(Patch(originx, originy, patch_num, stepdir, colormap))
-                
-                texture_def = TextureDefinition(name, width, height, patches)
-                self.textures[name] = texture_def
+            # Only the 8-byte name of each entry is read here; a map uses a small
+            # fraction of an IWAD's textures. Later entries win, as before
+            for texture_offset in texture_offsets:
+                name = _LUMP_NAME.unpack_from(texture_data, texture_offset)[0]
+                name = name.rstrip(b'\x00').decode('ascii', errors='ignore').upper()
+                self._texture_entries[name] = (texture_data, texture_offset)
+    
+    def _decode_texture(self, texture_data, texture_offset: int) -> TextureDefinition:
+        """Decode one TEXTUREx entry: header and patch list"""
+        name, _, width, height, _, patch_count = _TEXTURE_HEADER.unpack_from(texture_data, texture_offset)
+        name = name.rstrip(b'\x00').decode('ascii', errors='ignore').upper()
+        
+        start = texture_offset + _TEXTURE_HEADER.size
+        end = start + patch_count * _TEXTURE_PATCH.size
+        if end > len(texture_data):
+            raise struct.error(f"TEXTURE entry {name} runs past the end of the lump")
+        patches = [Patch(*fields) for fields in _TEXTURE_PATCH.iter_unpack(texture_data[start:end])]
+        
+        return TextureDefinition(name, width, height, patches)
     
     def get_texture(self, name: str) -> Optional[TextureDefinition]:
         """Get texture definition by name"""
-        return self.textures.get(name.upper())
+        name = name.upper()
+        texture = self.textures.get(name)
+        if texture is None:
+            entry = self._texture_entries.get(name)
+            if entry is None:
+                return None
+            texture = self.textures[name] = self._decode_texture(*entry)
+        return texture
     
     def get_patches_for_texture(self, name: str) -> List[str]:
         """Get list of patch names used by a texture"""
@@ -331,6 +364,58 @@ class TextureManager:
         return patch_names
 
 
+def _decode_columns_numpy(data: np.ndarray, column_pointers: np.ndarray, pixels: np.ndarray):
+    """Fill a (width, height) pixels array from the posts of each picture column"""
+    raw = memoryview(data)
+    size = len(raw)
+    height = pixels.shape[1]
+    
+    for x in range(len(column_pointers)):
+        offset = int(column_pointers[x])
+        
+        # Posts: row_start, pixel_count, pad, pixels..., pad; 255 ends the column
+        while offset + 1 < size:
+            row_start = raw[offset]
+            if row_start == 255:
+                break
+            
+            pixel_count = raw[offset + 1]
+            offset += 3
+            
+            # Copy the post in one slice, clipped to the lump and the picture height
+            count = min(pixel_count, size - offset, height - row_start)
+            if count > 0:
+                pixels[x, row_start:row_start + count] = data[offset:offset + count]
+            
+            offset += pixel_count + 1
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _decode_columns(data, column_pointers, pixels):
+        """Numba version of _decode_columns_numpy(): the post walk compiled once and cached"""
+        size = data.shape[0]
+        height = pixels.shape[1]
+        for x in range(column_pointers.shape[0]):
+            offset = column_pointers[x]
+            while offset + 1 < size:
+                row_start = data[offset]
+                if row_start == 255:
+                    break
+                pixel_count = data[offset + 1]
+                offset += 3
+                for i in range(pixel_count):
+                    if offset >= size:
+                        break
+                    y = row_start + i
+                    if y < height:
+                        pixels[x, y] = data[offset]
+                    offset += 1
+                offset += 1
+else:
+    _decode_columns = _decode_columns_numpy
+
+
 class DoomGraphic:
     """Doom picture format parser"""
     
@@ -341,6 +426,7 @@ class DoomGraphic:
         self.left_offset = 0
         self.top_offset = 0
         self.pixels = None
+        self.solid = False  # no transparent pixels at all
         self._parse()
     
     def _parse(self):
@@ -348,59 +434,31 @@ class DoomGraphic:
         if len(self.data) < 8:
             return
         
-        self.width = struct.unpack('<H', self.data[0:2])[0]
-        self.height = struct.unpack('<H', self.data[2:4])[0]
-        self.left_offset = struct.unpack('<h', self.data[4:6])[0]
-        self.top_offset = struct.unpack('<h', self.data[6:8])[0]
-        
-        self.pixels = [[-1 for _ in range(self.height)] for _ in range(self.width)]
+        self.width, self.height, self.left_offset, self.top_offset = _PICTURE_HEADER.unpack_from(self.data, 0)
         
-        column_pointers = []
-        for x in range(self.width):
-            ptr = struct.unpack('<I', self.data[8 + x * 4:8 + x * 4 + 4])[0]
-            column_pointers.append(ptr)
+        # An empty picture keeps pixels = None, which every caller skips
+        if self.width == 0 or self.height == 0:
+            return
         
-        for x in range(self.width):
-            offset = column_pointers[x]
-            
-            while True:
-                if offset >= len(self.data):
-                    break
-                
-                row_start = self.data[offset]
-                if row_start == 255:
-                    break
-                
-                offset += 1
-                pixel_count = self.data[offset]
-                offset += 1
-                offset += 1
-                
-                for i in range(pixel_count):
-                    if offset >= len(self.data):
-                        break
-                    y = row_start + i
-                    if y < self.height:
-                        self.pixels[x][y] = self.data[offset]
-                    offset += 1
-                
-                offset += 1
-    
-    def to_rgba(self, palette: List[Tuple[int, int, int]]) -> bytes:
-        """Convert to RGBA bytes using provided palette"""
-        rgba_data = bytearray()
+        # One contiguous int16 array instead of per-column lists: palette index
+        # per (x, y), -1 where no post covers the pixel (transparent)
+        self.pixels = np.full((self.width, self.height), -1, dtype=np.int16)
+        data = np.frombuffer(self.data, dtype=np.uint8)
         
-        for y in range(self.height):
-            for x in range(self.width):
-                palette_index = self.pixels[x][y]
-                
-                if palette_index == -1:
-                    rgba_data.extend([0, 0, 0, 0])
-                else:
-                    r, g, b = palette[palette_index]
-                    rgba_data.extend([r, g, b, 255])
+        column_pointers = np.frombuffer(self.data, dtype='<u4', count=self.width, offset=8).astype(np.int64)
+        _decode_columns(data, column_pointers, self.pixels)
         
-        return bytes(rgba_data)
+        # Most wall patches cover every pixel; those can be copied without a mask
+        self.solid = bool(self.pixels.min() >= 0)
+    
+    def to_rgba(self, palette: np.ndarray) -> bytes:
+        """Convert to RGBA bytes using provided (256, 4) palette lookup table"""
+        pixels = self.pixels.T
+        # One 32-bit load per pixel; -1 wraps to 255 and is then cleared
+        rgba = packed_palette(palette)[pixels.astype(np.uint8)]
+        if not self.solid:
+            rgba[pixels == -1] = 0
+        return rgba.tobytes()
 
 
 class FlatGraphic:
@@ -411,49 +469,117 @@ class FlatGraphic:
         self.width = 64
         self.height = 64
     
-    def to_rgba(self, palette: List[Tuple[int, int, int]]) -> bytes:
-        """Convert to RGBA bytes using provided palette"""
-        rgba_data = bytearray()
-        
-        for i in range(self.width * self.height):
-            if i < len(self.data):
-                palette_index = self.data[i]
-                r, g, b = palette[palette_index]
-                rgba_data.extend([r, g, b, 255])
-            else:
-                rgba_data.extend([0, 0, 0, 255])
-        
-        return bytes(rgba_data)
+    def to_rgba(self, palette: np.ndarray) -> bytes:
+        """Convert to RGBA bytes using provided (256, 4) palette lookup table"""
+        # One gather for the whole flat; a short lump is padded with opaque black
+        count = min(len(self.data), self.width * self.height)
+        rgba = np.zeros((self.width * self.height, 4), dtype=np.uint8)
+        rgba[:, 3] = 255
+        rgba.view(np.uint32)[:count, 0] = packed_palette(palette)[np.frombuffer(self.data, dtype=np.uint8, count=count)]
+        return rgba.tobytes()
+
+
+class GraphicCache:
+    """Patches parsed once by name, looked up in each WAD in turn (PWAD first)"""
+    
+    def __init__(self, *wads: WadReader):
+        self.wads = wads
+        self._cache: Dict[str, Optional[DoomGraphic]] = {}
+    
+    def get(self, name: str) -> Optional[DoomGraphic]:
+        """Parsed patch, or None if no WAD has a lump by that name"""
+        key = name.upper()
+        if key not in self._cache:
+            graphic = None
+            for wad in self.wads:
+                lump = wad.find_lump(key)
+                if lump:
+                    graphic = DoomGraphic(wad.read_lump(lump))
+                    break
+            self._cache[key] = graphic
+        return self._cache[key]
+    
+    def add(self, name: str, data: bytes) -> DoomGraphic:
+        """Parse and cache a patch whose lump the caller has already found"""
+        key = name.upper()
+        graphic = self._cache.get(key)
+        if graphic is None:
+            graphic = self._cache[key] = DoomGraphic(data)
+        return graphic
 
 
-def load_palette(wad: WadReader) -> List[Tuple[int, int, int]]:
-    """Load PLAYPAL from WAD"""
+def load_palette(wad: WadReader) -> np.ndarray:
+    """Load PLAYPAL from WAD as a (256, 4) RGBA lookup table (alpha 255)"""
     playpal_data = wad.read_lump_by_name('PLAYPAL')
     if not playpal_data or len(playpal_data) < 768:
         raise ValueError("PLAYPAL not found or invalid")
     
-    palette = []
-    for i in range(256):
-        offset = i * 3
-        r = playpal_data[offset]
-        g = playpal_data[offset + 1]
-        b = playpal_data[offset + 2]
-        palette.append((r, g, b))
+    palette = np.full((256, 4), 255, dtype=np.uint8)
+    palette[:, :3] = np.frombuffer(playpal_data, dtype=np.uint8, count=768).reshape(256, 3)
     
     return palette
 
 
-def save_as_png(rgba_data: bytes, width: int, height: int, filepath: Path):
+def packed_palette(palette: np.ndarray) -> np.ndarray:
+    """The (256, 4) RGBA palette as 256 uint32 pixels sharing its memory"""
+    # Gathering whole 32-bit pixels is one load per pixel instead of four byte copies
+    return np.ascontiguousarray(palette).view(np.uint32).reshape(256)
+
+
+# Output file buffer for PNGs: large enough that a typical texture is one write
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+def save_as_png(rgba_data: bytes, width: int, height: int, filepath: Path, compress_level: int = 1):
     """Save RGBA data as PNG using PIL"""
-    from PIL import Image
-    img = Image.frombytes('RGBA', (width, height), rgba_data)
-    img.save(filepath)
+    # frombuffer wraps the RGBA bytes without copying them; these are extraction
+    # intermediates, so fast zlib beats the default level 6's smaller files
+    img = Image.frombuffer('RGBA', (width, height), rgba_data, 'raw', 'RGBA', 0, 1)
+    # PIL emits every PNG chunk as its own write(); a buffer big enough for the
+    # whole file turns those into a single syscall at close
+    with open(filepath, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+        img.save(f, format='PNG', compress_level=compress_level)
+
+
+def write_lump(filepath: Path, data: bytes):
+    """Write raw lump bytes to a file"""
+    # BufferedWriter hands anything larger than its buffer straight to the OS
+    # in one call, and loops on short writes
+    with open(filepath, 'wb') as f:
+        f.write(data)
+
+
+class PngWriter:
+    """save_as_png, optionally spread over worker processes"""
+    
+    def __init__(self, jobs: int = 1):
+        self._pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+        self._pending = []
+    
+    def save(self, rgba_data: bytes, width: int, height: int, filepath: Path):
+        if self._pool is None:
+            save_as_png(rgba_data, width, height, filepath)
+        else:
+            # Only the RGBA bytes cross over; workers never touch the WAD files
+            self._pending.append(self._pool.submit(save_as_png, rgba_data, width, height, filepath))
+    
+    def close(self):
+        """Wait for queued PNGs (re-raising the first failure) and stop the workers"""
+        if self._pool is None:
+            return
+        try:
+            for future in self._pending:
+                future.result()
+        finally:
+            self._pool.shutdown()
 
 
 def composite_texture(texture_def: TextureDefinition, patch_graphics: Dict[str, DoomGraphic], 
-                     pnames: List[str], palette: List[Tuple[int, int, int]]) -> bytes:
+                     pnames: List[str], palette: np.ndarray) -> bytes:
     """Composite a texture from multiple patches"""
-    rgba_data = bytearray([0, 0, 0, 0] * texture_def.width * texture_def.height)
+    canvas = np.zeros((texture_def.height, texture_def.width, 4), dtype=np.uint8)
+    pixels = canvas.view(np.uint32).reshape(texture_def.height, texture_def.width)
+    lut = packed_palette(palette)
     
     for patch in texture_def.patches:
         if patch.patch_num >= len(pnames):
@@ -465,26 +591,27 @@ def composite_texture(texture_def: TextureDefinition, patch_graphics: Dict[str,
         
         graphic = patch_graphics[patch_name]
         
-        if not graphic.pixels:
+        if graphic.pixels is None:
             continue
         
-        for px in range(graphic.width):
-            for py in range(graphic.height):
-                tx = patch.originx + px
-                ty = patch.originy + py
-                
-                if 0 <= tx < texture_def.width and 0 <= ty < texture_def.height:
-                    palette_index = graphic.pixels[px][py]
-                    
-                    if palette_index != -1:
-                        offset = (ty * texture_def.width + tx) * 4
-                        r, g, b = palette[palette_index]
-                        rgba_data[offset] = r
-                        rgba_data[offset + 1] = g
-                        rgba_data[offset + 2] = b
-                        rgba_data[offset + 3] = 255
+        # Clip the patch rectangle to the texture
+        x0 = max(0, patch.originx)
+        x1 = min(texture_def.width, patch.originx + graphic.width)
+        y0 = max(0, patch.originy)
+        y1 = min(texture_def.height, patch.originy + graphic.height)
+        if x0 >= x1 or y0 >= y1:
+            continue
+        
+        # Blit the opaque pixels only; transparent ones keep what's underneath
+        src = graphic.pixels[x0 - patch.originx:x1 - patch.originx,
+                             y0 - patch.originy:y1 - patch.originy].T
+        if graphic.solid:
+            pixels[y0:y1, x0:x1] = lut[src]
+        else:
+            mask = src != -1
+            pixels[y0:y1, x0:x1][mask] = lut[src[mask]]
     
-    return bytes(rgba_data)
+    return canvas.tobytes()
 
 
 def main():
@@ -495,8 +622,13 @@ def main():
     parser.add_argument('-list', action='store_true', help='List resources only')
     parser.add_argument('-lump', action='store_true', help='Extract as raw lumps')
     parser.add_argument('-png', action='store_true', help='Extract as PNG files')
+    parser.add_argument('-j', '-jobs', dest='jobs', type=int, default=1, metavar='N',
+                        help='Encode PNGs in N worker processes (default: 1, 0 = one per CPU core)')
     
     args = parser.parse_args()
+    if args.jobs < 0:
+        parser.error('-jobs must be 0 or greater')
+    jobs = args.jobs or os.cpu_count() or 1
     
     if not args.list and not args.lump and not args.png:
         args.png = True
@@ -558,6 +690,10 @@ def main():
                     palette = load_palette(iwad)
                     print("Using PLAYPAL from IWAD")
                 
+                # Patches are shared between the patch export and every composite using them
+                graphics = GraphicCache(wad, iwad)
+                pngs = PngWriter(jobs if args.png else 1)
+                
                 base_dir = Path('.')
                 flats_dir = base_dir / 'flats'
                 patches_dir = base_dir / 'patches'
@@ -592,13 +728,13 @@ def main():
                     
                     if args.lump:
                         output_file = output_dir / f"{flat_name}.lmp"
-                        output_file.write_bytes(data)
+                        write_lump(output_file, data)
                         print(f"  {flat_name} -> {output_file}")
                     elif args.png:
                         flat = FlatGraphic(data)
                         rgba_data = flat.to_rgba(palette)
                         output_file = output_dir / f"{flat_name}.png"
-                        save_as_png(rgba_data, flat.width, flat.height, output_file)
+                        pngs.save(rgba_data, flat.width, flat.height, output_file)
                         print(f"  {flat_name} -> {output_file}")
                 
                 print("\nExtracting patches...")
@@ -618,18 +754,18 @@ def main():
                         print(f"  Warning: Patch {patch_name} not found")
                         continue
                     
-                    data = source_wad.read_lump(lump)
-                    
                     if args.lump:
+                        data = source_wad.read_lump(lump)
                         output_file = output_dir / f"{patch_name}.lmp"
-                        output_file.write_bytes(data)
+                        write_lump(output_file, data)
                         print(f"  {patch_name} -> {output_file}")
                     elif args.png:
-                        graphic = DoomGraphic(data)
-                        if graphic.pixels:
+                        # The composites below reuse this parse instead of looking the lump up again
+                        graphic = graphics.add(patch_name, source_wad.read_lump(lump))
+                        if graphic.pixels is not None:
                             rgba_data = graphic.to_rgba(palette)
                             output_file = output_dir / f"{patch_name}.png"
-                            save_as_png(rgba_data, graphic.width, graphic.height, output_file)
+                            pngs.save(rgba_data, graphic.width, graphic.height, output_file)
                             print(f"  {patch_name} -> {output_file}")
                 
                 if args.png:
@@ -668,22 +804,15 @@ def main():
                                 pname = pnames[patch.patch_num]
                                 
                                 # Try PWAD first, then IWAD
-                                lump = wad.find_lump(pname)
-                                if lump:
-                                    data = wad.read_lump(lump)
-                                else:
-                                    lump = iwad.find_lump(pname)
-                                    if lump:
-                                        data = iwad.read_lump(lump)
-                                    else:
-                                        print(f"  Warning: Patch {pname} not found for texture {texture_name}")
-                                        continue
+                                graphic = graphics.get(pname)
+                                if graphic is None:
+                                    print(f"  Warning: Patch {pname} not found for texture {texture_name}")
+                                    continue
                                 
-                                graphic = DoomGraphic(data)
-                                if graphic.pixels:
+                                if graphic.pixels is not None:
                                     rgba_data = graphic.to_rgba(palette)
                                     output_file = output_dir / f"{texture_name}.png"
-                                    save_as_png(rgba_data, graphic.width, graphic.height, output_file)
+                                    pngs.save(rgba_data, graphic.width, graphic.height, output_file)
                                     print(f"  {texture_name} (1 patch) -> {output_file}")
                             continue
                         
@@ -700,25 +829,17 @@ def main():
                             if patch.patch_num < len(pnames):
                                 pname = pnames[patch.patch_num]
                                 
-                                lump = wad.find_lump(pname)
-                                if lump:
-                                    data = wad.read_lump(lump)
-                                else:
-                                    lump = iwad.find_lump(pname)
-                                    if lump:
-                                        data = iwad.read_lump(lump)
-                                    else:
-                                        continue
-                                
-                                graphic = DoomGraphic(data)
-                                patch_graphics[pname] = graphic
+                                graphic = graphics.get(pname)
+                                if graphic is not None:
+                                    patch_graphics[pname] = graphic
                         
                         rgba_data = composite_texture(texture_def, patch_graphics, pnames, palette)
                         
                         output_file = output_dir / f"{texture_name}.png"
-                        save_as_png(rgba_data, texture_def.width, texture_def.height, output_file)
+                        pngs.save(rgba_data, texture_def.width, texture_def.height, output_file)
                         print(f"  {texture_name} ({len(patches)} patches) -> {output_file}")
                 
+                pngs.close()
                 print("\nDone!")
 
 
@@ -22,10 +22,21 @@ To use:
 
 from krita import Krita
 import os
-import math
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # Krita's bundled Python doesn't always ship numpy
+    np = None
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 # -------------------- USER TUNABLES --------------------
 SIM_MAX_DIST = 1.1            # try 3.6–4.2 for Doom ramps; default 1.1
+SIM_MAX_DIST2 = SIM_MAX_DIST * SIM_MAX_DIST  # keep in sync with SIM_MAX_DIST
 SIM_EXCLUDE_EXACT = True      # if True, SIMILAR ignores exact duplicates (IDENTICAL handles them)
 
 # -------------------- CONSTANTS --------------------
@@ -35,14 +46,6 @@ GROUP_IDENTICAL = "IDENTICAL"
 GROUP_SIMILAR   = "SIMILAR"
 BPP = 4  # assume RGBA/U8
 
-def _u8(v):
-    """Convert a byte/bytes/int channel value into an int 0..255."""
-    if isinstance(v, int):
-        return v
-    if isinstance(v, (bytes, bytearray)):
-        return v[0]
-    return int(v)
-
 def rgb_key(r, g, b):
     return f"{r},{g},{b}"
 
@@ -50,45 +53,130 @@ def safe_basename(name):
     return "".join("_" if c in '\\/:*?"<>|' else c for c in name)
 
 # ---- Union-Find (Disjoint Sets) ----
+# p[x] >= 0 is x's parent; p[root] < 0 is minus the size of root's set.
 class UnionFind:
     def __init__(self, n):
-        self.p = list(range(n))
-        self.r = [0] * n
+        self.p = [-1] * n
 
     def find(self, x):
-        while self.p[x] != x:
-            self.p[x] = self.p[self.p[x]]
-            x = self.p[x]
-        return x
+        p = self.p
+        root = x
+        while p[root] >= 0:
+            root = p[root]
+        # Full path compression
+        while p[x] >= 0 and p[x] != root:
+            p[x], x = root, p[x]
+        return root
 
     def union(self, a, b):
         ra = self.find(a)
         rb = self.find(b)
         if ra == rb:
             return
-        if self.r[ra] < self.r[rb]:
-            self.p[ra] = rb
-        elif self.r[ra] > self.r[rb]:
-            self.p[rb] = ra
-        else:
-            self.p[rb] = ra
-            self.r[ra] += 1
-
-def is_similar(a, b):
-    dr = abs(a["r"] - b["r"])
-    dg = abs(a["g"] - b["g"])
-    db = abs(a["b"] - b["b"])
-
-    if SIM_EXCLUDE_EXACT and dr == 0 and dg == 0 and db == 0:
-        return False
-
-    # Weighted RGB distance (luma-ish weighting)
-    d = math.sqrt(
-        (0.299 * dr) * (0.299 * dr) +
-        (0.587 * dg) * (0.587 * dg) +
-        (0.114 * db) * (0.114 * db)
-    )
-    return d <= SIM_MAX_DIST
+        p = self.p
+        # Union by size: hang the smaller set under the larger
+        if p[ra] > p[rb]:
+            ra, rb = rb, ra
+        p[ra] += p[rb]
+        p[rb] = ra
+
+# Luma-ish weights for the SIMILAR distance
+SIM_WEIGHTS = (0.299, 0.587, 0.114)
+
+def similar_pairs(colors):
+    """Return every (a, b) index pair with a < b whose colours are SIMILAR.
+
+    Two colours are similar when their SIM_WEIGHTS-weighted RGB distance is at
+    most SIM_MAX_DIST (compared squared). With SIM_EXCLUDE_EXACT, identical
+    colours never count as similar.
+    """
+    if np is None:
+        # Pure-Python path: integer maths with the weights scaled by 1000,
+        # no dict lookups, abs() or sqrt inside the pair loop
+        rgbs = [(c["r"], c["g"], c["b"]) for c in colors]
+        limit = int((SIM_MAX_DIST * 1000) ** 2)
+        exclude_exact = SIM_EXCLUDE_EXACT
+        n = len(rgbs)
+        pairs = []
+        for a in range(n):
+            ra, ga, ba = rgbs[a]
+            for b in range(a + 1, n):
+                rb, gb, bb = rgbs[b]
+                dr = ra - rb
+                dg = ga - gb
+                db = ba - bb
+                if exclude_exact and not (dr or dg or db):
+                    continue
+                if 89401 * dr * dr + 344569 * dg * dg + 12996 * db * db <= limit:
+                    pairs.append((a, b))
+        return pairs
+
+    rgb = np.array([(c["r"], c["g"], c["b"]) for c in colors], dtype=np.float64)
+    diff = (rgb[:, None, :] - rgb[None, :, :]) * np.array(SIM_WEIGHTS)
+    d2 = (diff * diff).sum(axis=-1)
+
+    mask = d2 <= SIM_MAX_DIST2
+    if SIM_EXCLUDE_EXACT:
+        mask &= (rgb[:, None, :] != rgb[None, :, :]).any(axis=-1)
+    mask &= np.triu(np.ones(mask.shape, dtype=bool), 1)
+    return [tuple(p) for p in np.argwhere(mask).tolist()]
+
+if njit is not None:
+    @njit(cache=True)
+    def _cluster_kernel(rgb, weights, thresh2, exclude_exact):
+        """Pair test + union-find in one compiled loop; returns root per colour."""
+        n = rgb.shape[0]
+        parent = np.full(n, -1, dtype=np.int64)  # same layout as UnionFind.p
+
+        for a in range(n):
+            for b in range(a + 1, n):
+                dr = rgb[a, 0] - rgb[b, 0]
+                dg = rgb[a, 1] - rgb[b, 1]
+                db = rgb[a, 2] - rgb[b, 2]
+                if exclude_exact and dr == 0 and dg == 0 and db == 0:
+                    continue
+                wr = weights[0] * dr
+                wg = weights[1] * dg
+                wb = weights[2] * db
+                if wr * wr + wg * wg + wb * wb > thresh2:
+                    continue
+
+                # union(a, b) by size
+                ra = a
+                while parent[ra] >= 0:
+                    ra = parent[ra]
+                rb = b
+                while parent[rb] >= 0:
+                    rb = parent[rb]
+                if ra == rb:
+                    continue
+                if parent[ra] > parent[rb]:
+                    ra, rb = rb, ra
+                parent[ra] += parent[rb]
+                parent[rb] = ra
+                if a != ra:
+                    parent[a] = ra
+                if b != ra:
+                    parent[b] = ra
+
+        roots = np.empty(n, dtype=np.int64)
+        for i in range(n):
+            r = i
+            while parent[r] >= 0:
+                r = parent[r]
+            roots[i] = r
+        return roots
+
+def cluster_roots(colors):
+    """Union-Find root for every colour index under the SIMILAR test."""
+    if njit is not None:
+        rgb = np.array([(c["r"], c["g"], c["b"]) for c in colors], dtype=np.float64)
+        return _cluster_kernel(rgb, np.array(SIM_WEIGHTS), SIM_MAX_DIST2, SIM_EXCLUDE_EXACT).tolist()
+
+    uf = UnionFind(len(colors))
+    for a, b in similar_pairs(colors):
+        uf.union(a, b)
+    return [uf.find(i) for i in range(len(colors))]
 
 def _make_group(doc, name):
     root = doc.rootNode()
@@ -105,18 +193,47 @@ def _blank_rgba_buffer(w, h):
     # Transparent RGBA
     return bytearray(w * h * 4)
 
-def _set_block(buf, w, x0, y0, size, rgba):
+def _swap_red_blue(data):
+    """BGRA <-> RGBA for a whole 4-byte-per-pixel buffer, done in C by slice copies."""
+    out = bytearray(data)
+    out[0::4] = data[2::4]
+    out[2::4] = data[0::4]
+    return out
+
+def _block_row(rgba, size):
+    """One scanline of a size-wide block in Krita's BGRA order."""
     r, g, b, a = rgba
-    r &= 0xFF; g &= 0xFF; b &= 0xFF; a &= 0xFF
-    # Krita uses BGRA order
+    return bytes((b & 0xFF, g & 0xFF, r & 0xFF, a & 0xFF)) * size
+
+def _paint_block(buf, w, x0, y0, row):
+    """Copy a prebuilt block scanline into a square block at (x0, y0)."""
+    size = len(row) // 4
     for yy in range(y0, y0 + size):
         row_base = (yy * w + x0) * 4
-        for xx in range(size):
-            j = row_base + xx * 4
-            buf[j + 0] = b  # B at index 0
-            buf[j + 1] = g  # G at index 1
-            buf[j + 2] = r  # R at index 2
-            buf[j + 3] = a  # A at index 3
+        buf[row_base:row_base + len(row)] = row
+
+def _set_block(buf, w, x0, y0, size, rgba):
+    _paint_block(buf, w, x0, y0, _block_row(rgba, size))
+
+def _identical_layer_pixels(members, colors, w, h):
+    """Layer pixels for one IDENTICAL set: every member block in the shared colour."""
+    rep = colors[members[0]]
+    # Every member is painted the same colour: build the tile row once
+    row = _block_row((rep["r"], rep["g"], rep["b"], 255), CELL)
+    buf = _blank_rgba_buffer(w, h)
+    for midx in members:
+        c = colors[midx]
+        _paint_block(buf, w, c["x"], c["y"], row)
+    return bytes(buf)
+
+def _similar_layer_pixels(members, colors, w, h):
+    """Layer pixels for one SIMILAR cluster: each member block in its own colour."""
+    buf = _blank_rgba_buffer(w, h)
+    for midx in members:
+        c = colors[midx]
+        rgba = (c["r"], c["g"], c["b"], 255)
+        _set_block(buf, w, c["x"], c["y"], CELL, rgba)
+    return bytes(buf)
 
 def _show_done_message(text):
     # Optional: show a QMessageBox if available; otherwise print.
@@ -165,8 +282,9 @@ def main():
         return
     
     # Update the global threshold
-    global SIM_MAX_DIST
+    global SIM_MAX_DIST, SIM_MAX_DIST2
     SIM_MAX_DIST = sim_threshold
+    SIM_MAX_DIST2 = sim_threshold * sim_threshold
 
     w = src.width()
     h = src.height()
@@ -177,33 +295,29 @@ def main():
         return
 
     # Read all pixels once from the source document
-    src_bytes = src.pixelData(0, 0, w, h)
-
-    def get_rgba_at(px, py):
-        """Get RGBA values at a specific pixel position"""
-        i = (py * w + px) * BPP
-        # Krita stores pixels in BGRA order (not RGBA)
-        return (
-            _u8(src_bytes[i + 2]),  # R is at index 2
-            _u8(src_bytes[i + 1]),  # G is at index 1
-            _u8(src_bytes[i + 0]),  # B is at index 0
-            _u8(src_bytes[i + 3]),  # A is at index 3
-        )
+    src_bytes = bytes(src.pixelData(0, 0, w, h))
+
+    # Krita stores pixels in BGRA order; flip the whole buffer to RGBA once
+    # so sampling below reads channels in their natural order
+    src_rgba = _swap_red_blue(src_bytes)
 
-    # Sample the centre pixel of each cell
+    # Sample the centre pixel of each cell.
+    # The centres of one grid row sit CELL pixels apart on the same scanline,
+    # so each channel of the whole row is a single strided slice.
     colors = [None] * (GRID * GRID)  # dicts: {idx,x,y,r,g,b,key}
+    step = CELL * BPP
     for gy in range(GRID):
-        for gx in range(GRID):
-            x0 = gx * CELL
-            y0 = gy * CELL
-            sx = x0 + (CELL // 2)
-            sy = y0 + (CELL // 2)
+        y0 = gy * CELL
+        sy = y0 + (CELL // 2)
+        start = (sy * w + CELL // 2) * BPP
+        line = src_rgba[start:(sy + 1) * w * BPP]
 
-            r, g, b, a = get_rgba_at(sx, sy)
+        samples = zip(line[0::step], line[1::step], line[2::step], line[3::step])
+        for gx, (r, g, b, a) in enumerate(samples):
             idx = gy * GRID + gx
             colors[idx] = {
                 "idx": idx,
-                "x": x0, "y": y0,
+                "x": gx * CELL, "y": y0,
                 "r": r, "g": g, "b": b, "a": a,
                 "key": rgb_key(r, g, b)
             }
@@ -227,7 +341,7 @@ def main():
     dup_root = dup_doc.rootNode()
     base_layer = dup_doc.createNode("BASE", "paintlayer")
     dup_root.addChildNode(base_layer, None)
-    base_layer.setPixelData(bytes(src_bytes), 0, 0, w, h)
+    base_layer.setPixelData(src_bytes, 0, 0, w, h)
     dup_doc.refreshProjection()
 
     # Show duplicate as a tab
@@ -254,57 +368,42 @@ def main():
 
     identical_keys = [k for k, members in exact_map.items() if len(members) >= 2]
     identical_keys.sort()
-
-    grp_identical = _make_group(dup_doc, GROUP_IDENTICAL)
-
-    for key in identical_keys:
-        members = sorted(exact_map[key])
-        rep = colors[members[0]]
-        rgba = (rep["r"], rep["g"], rep["b"], 255)
-
-        layer_name = f"dup RGB({key}) idx {','.join(str(i) for i in members)}"
-        lyr = _make_paint_layer(dup_doc, grp_identical, layer_name)
-
-        buf = _blank_rgba_buffer(w, h)
-        for midx in members:
-            c = colors[midx]
-            _set_block(buf, w, c["x"], c["y"], CELL, rgba)
-
-        lyr.setPixelData(bytes(buf), 0, 0, w, h)
+    identical_sets = [sorted(exact_map[key]) for key in identical_keys]
 
     # ---------------------------------------------------------------------
     # 2) SIMILAR (transitive clustering, 2+)
     # ---------------------------------------------------------------------
-    uf = UnionFind(len(colors))
-    for a in range(len(colors)):
-        for b in range(a + 1, len(colors)):
-            if is_similar(colors[a], colors[b]):
-                uf.union(a, b)
-
     clusters = {}  # root -> list of indices
-    for i in range(len(colors)):
-        root = uf.find(i)
+    for i, root in enumerate(cluster_roots(colors)):
         clusters.setdefault(root, []).append(i)
 
     cluster_list = [sorted(v) for v in clusters.values() if len(v) >= 2]
     cluster_list.sort(key=lambda lst: min(lst))
 
-    grp_similar = _make_group(dup_doc, GROUP_SIMILAR)
-
-    for members in cluster_list:
-        rep = colors[members[0]]
-        layer_name = f"sim RGB({rep['r']},{rep['g']},{rep['b']}) idx {','.join(str(i) for i in members)}"
-        lyr = _make_paint_layer(dup_doc, grp_similar, layer_name)
-
-        buf = _blank_rgba_buffer(w, h)
-
-        # Paint each block using its own colour
-        for midx in members:
-            c = colors[midx]
-            rgba = (c["r"], c["g"], c["b"], 255)
-            _set_block(buf, w, c["x"], c["y"], CELL, rgba)
-
-        lyr.setPixelData(bytes(buf), 0, 0, w, h)
+    # ---------------------------------------------------------------------
+    # Paint every layer buffer on a thread pool; Krita nodes must still be
+    # created and filled on this (the GUI) thread, in order, below.
+    # ---------------------------------------------------------------------
+    with ThreadPoolExecutor() as pool:
+        identical_pixels = pool.map(
+            lambda members: _identical_layer_pixels(members, colors, w, h), identical_sets)
+        similar_pixels = pool.map(
+            lambda members: _similar_layer_pixels(members, colors, w, h), cluster_list)
+
+        grp_identical = _make_group(dup_doc, GROUP_IDENTICAL)
+
+        for key, members, pixels in zip(identical_keys, identical_sets, identical_pixels):
+            layer_name = f"dup RGB({key}) idx {','.join(str(i) for i in members)}"
+            lyr = _make_paint_layer(dup_doc, grp_identical, layer_name)
+            lyr.setPixelData(pixels, 0, 0, w, h)
+
+        grp_similar = _make_group(dup_doc, GROUP_SIMILAR)
+
+        for members, pixels in zip(cluster_list, similar_pixels):
+            rep = colors[members[0]]
+            layer_name = f"sim RGB({rep['r']},{rep['g']},{rep['b']}) idx {','.join(str(i) for i in members)}"
+            lyr = _make_paint_layer(dup_doc, grp_similar, layer_name)
+            lyr.setPixelData(pixels, 0, 0, w, h)
 
     dup_doc.refreshProjection()
 
@@ -13,13 +13,6 @@ Krita: SlaDE palette PNG (16x16 swatches) -> 256x1 strip (1px per colour)
 from krita import Krita, InfoObject
 import os
 
-def _u8(v):
-    if isinstance(v, int):
-        return v
-    if isinstance(v, (bytes, bytearray)):
-        return v[0]
-    return int(v)
-
 def safe_basename(name):
     return "".join("_" if c in '\\/:*?"<>|' else c for c in name)
 
@@ -44,16 +37,11 @@ def main():
     cx = sw // 2
     cy = sh // 2
 
-    src_bytes = src.pixelData(0, 0, src_w, src_h)
+    src_bytes = bytes(src.pixelData(0, 0, src_w, src_h))
 
     def get_rgba_at(x, y):
         i = (y * src_w + x) * bpp
-        return (
-            _u8(src_bytes[i + 0]),
-            _u8(src_bytes[i + 1]),
-            _u8(src_bytes[i + 2]),
-            _u8(src_bytes[i + 3]),
-        )
+        return src_bytes[i:i + bpp]  # plain bytes: channels index as ints
 
     out_w, out_h = 256, 1
 
@@ -78,23 +66,15 @@ def main():
     out_layer = out_doc.createNode("strip_256x1", "paintlayer")
     out_root.addChildNode(out_layer, None)
 
-    out_buf = bytearray(out_w * out_h * 4)
-
-    def set_out_pixel(x, rgba):
-        j = x * 4
-        out_buf[j + 0] = int(rgba[0]) & 0xFF
-        out_buf[j + 1] = int(rgba[1]) & 0xFF
-        out_buf[j + 2] = int(rgba[2]) & 0xFF
-        out_buf[j + 3] = int(rgba[3]) & 0xFF
-
     # Row-major order: top row left->right, then next row...
-    for idx in range(256):
-        row = idx // 16
-        col = idx % 16
-        rgba = get_rgba_at(col * sw + cx, row * sh + cy)
-        set_out_pixel(idx, rgba)
-
-    out_layer.setPixelData(bytes(out_buf), 0, 0, out_w, out_h)
+    # Joined straight into bytes so setPixelData needs no extra copy
+    out_buf = b"".join(
+        get_rgba_at(col * sw + cx, row * sh + cy)
+        for row in range(16)
+        for col in range(16)
+    )
+
+    out_layer.setPixelData(out_buf, 0, 0, out_w, out_h)
     out_doc.refreshProjection()
 
     export_params = InfoObject()
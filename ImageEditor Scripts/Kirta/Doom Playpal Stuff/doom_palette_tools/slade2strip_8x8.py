@@ -16,13 +16,6 @@ Output file:
 from krita import Krita, InfoObject
 import os
 
-def _u8(v):
-    if isinstance(v, int):
-        return v
-    if isinstance(v, (bytes, bytearray)):
-        return v[0]
-    return int(v)
-
 def safe_basename(name):
     return "".join("_" if c in '\\/:*?"<>|' else c for c in name)
 
@@ -49,16 +42,11 @@ def main():
     cy = sh // 2
 
     # Read source pixels once
-    src_bytes = src.pixelData(0, 0, src_w, src_h)
+    src_bytes = bytes(src.pixelData(0, 0, src_w, src_h))
 
     def get_rgba_at(x, y):
         i = (y * src_w + x) * bpp
-        return (
-            _u8(src_bytes[i + 0]),
-            _u8(src_bytes[i + 1]),
-            _u8(src_bytes[i + 2]),
-            _u8(src_bytes[i + 3]),
-        )
+        return src_bytes[i:i + bpp]  # plain bytes: channels index as ints
 
     # Output dimensions: 256 * 8 x 8
     cell = 8
@@ -87,29 +75,17 @@ def main():
     out_layer = out_doc.createNode("strip_8x8", "paintlayer")
     out_root.addChildNode(out_layer, None)
 
-    # Output pixel buffer
-    out_buf = bytearray(out_w * out_h * 4)
-
-    def set_pixel(x, y, rgba):
-        j = (y * out_w + x) * 4
-        out_buf[j + 0] = int(rgba[0]) & 0xFF
-        out_buf[j + 1] = int(rgba[1]) & 0xFF
-        out_buf[j + 2] = int(rgba[2]) & 0xFF
-        out_buf[j + 3] = int(rgba[3]) & 0xFF
-
-    # Build strip
-    for idx in range(256):
-        row = idx // 16
-        col = idx % 16
-
-        rgba = get_rgba_at(col * sw + cx, row * sh + cy)
-
-        x0 = idx * cell
-        for yy in range(cell):
-            for xx in range(cell):
-                set_pixel(x0 + xx, yy, rgba)
-
-    out_layer.setPixelData(bytes(out_buf), 0, 0, out_w, out_h)
+    # Build strip: one cell-wide run of pixels per colour. Every output row
+    # is the same, so build one scanline and repeat it; the result is already
+    # bytes, so setPixelData needs no extra copy.
+    line = b"".join(
+        get_rgba_at(col * sw + cx, row * sh + cy) * cell
+        for row in range(16)
+        for col in range(16)
+    )
+    out_buf = line * out_h
+
+    out_layer.setPixelData(out_buf, 0, 0, out_w, out_h)
     out_doc.refreshProjection()
 
     # --- Silent PNG export ---
@@ -17,14 +17,6 @@ Opens the saved PNG in Krita after export.
 from krita import Krita, InfoObject
 import os
 
-def _u8(v):
-    """Convert a byte/bytes/int channel value into an int 0..255."""
-    if isinstance(v, int):
-        return v
-    if isinstance(v, (bytes, bytearray)):
-        return v[0]
-    return int(v)
-
 def safe_basename(name):
     return "".join("_" if c in '\\/:*?"<>|' else c for c in name)
 
@@ -48,15 +40,7 @@ def main():
     bpp = 4  # RGBA/U8
 
     # Read strip pixels once
-    src_bytes = src.pixelData(0, 0, src_w, src_h)
-
-    def get_rgba_at(x):
-        i = x * bpp
-        r = _u8(src_bytes[i + 0])
-        g = _u8(src_bytes[i + 1])
-        b = _u8(src_bytes[i + 2])
-        a = _u8(src_bytes[i + 3])
-        return (r, g, b, a)
+    src_bytes = bytes(src.pixelData(0, 0, src_w, src_h))
 
     # Output: 128x128 (16x16 cells, each 8x8)
     grid = 16
@@ -91,31 +75,19 @@ def main():
     out_layer = out_doc.createNode("slade_palette", "paintlayer")
     out_root.addChildNode(out_layer, None)
 
-    # Build output buffer (RGBA)
-    out_buf = bytearray(out_w * out_h * 4)
-
-    def set_pixel(px, py, rgba):
-        j = (py * out_w + px) * 4
-        out_buf[j + 0] = int(rgba[0]) & 0xFF
-        out_buf[j + 1] = int(rgba[1]) & 0xFF
-        out_buf[j + 2] = int(rgba[2]) & 0xFF
-        out_buf[j + 3] = int(rgba[3]) & 0xFF
-
-    # Fill each 8x8 cell from the strip, row-major order
-    for idx in range(256):
-        rgba = get_rgba_at(idx)
-        row = idx // grid
-        col = idx % grid
-
-        x0 = col * cell
-        y0 = row * cell
-
-        for yy in range(y0, y0 + cell):
-            for xx in range(x0, x0 + cell):
-                set_pixel(xx, yy, rgba)
+    # Build output buffer (RGBA): each grid row is 16 strip pixels widened to
+    # 8 pixels apiece, and that scanline repeated 8 times
+    scanlines = []
+    for row in range(grid):
+        line = b"".join(
+            src_bytes[idx * bpp:(idx + 1) * bpp] * cell
+            for idx in range(row * grid, (row + 1) * grid)
+        )
+        scanlines.append(line * cell)
+    out_buf = b"".join(scanlines)
 
     # Write pixels to layer
-    out_layer.setPixelData(bytes(out_buf), 0, 0, out_w, out_h)
+    out_layer.setPixelData(out_buf, 0, 0, out_w, out_h)
     out_doc.refreshProjection()
 
     # --- SILENT EXPORT SETTINGS (no dialog) ---
@@ -19,12 +19,10 @@ Opens the saved PNG in Krita after export.
 from krita import Krita, InfoObject
 import os
 
-def _u8(v):
-    if isinstance(v, int):
-        return v
-    if isinstance(v, (bytes, bytearray)):
-        return v[0]
-    return int(v)
+try:
+    import numpy as np
+except ImportError:  # Krita's bundled Python doesn't always ship numpy
+    np = None
 
 def safe_basename(name):
     return "".join("_" if c in '\\/:*?"<>|' else c for c in name)
@@ -47,16 +45,7 @@ def main():
     bpp = 4
 
     # Read source pixels once
-    src_bytes = src.pixelData(0, 0, src_w, src_h)
-
-    def get_rgba_at(x, y):
-        i = (y * src_w + x) * bpp
-        return (
-            _u8(src_bytes[i + 0]),
-            _u8(src_bytes[i + 1]),
-            _u8(src_bytes[i + 2]),
-            _u8(src_bytes[i + 3]),
-        )
+    src_bytes = bytes(src.pixelData(0, 0, src_w, src_h))
 
     # Output is 128x128 (16x16 cells, each 8x8)
     grid = 16
@@ -89,34 +78,29 @@ def main():
     out_layer = out_doc.createNode("slade_palette", "paintlayer")
     out_root.addChildNode(out_layer, None)
 
-    out_buf = bytearray(out_w * out_h * 4)
-
-    def set_pixel(x, y, rgba):
-        j = (y * out_w + x) * 4
-        out_buf[j + 0] = int(rgba[0]) & 0xFF
-        out_buf[j + 1] = int(rgba[1]) & 0xFF
-        out_buf[j + 2] = int(rgba[2]) & 0xFF
-        out_buf[j + 3] = int(rgba[3]) & 0xFF
-
     # For each colour index i:
     # sample the centre of each 8x8 block in the strip at (i*8+4, 4)
     # then fill the corresponding 8x8 cell in the 16x16 output grid.
-    for idx in range(256):
-        sx = idx * cell + (cell // 2)  # idx*8 + 4
-        sy = cell // 2                 # 4
-        rgba = get_rgba_at(sx, sy)
-
-        row = idx // grid
-        col = idx % grid
-
-        x0 = col * cell
-        y0 = row * cell
-
-        for yy in range(y0, y0 + cell):
-            for xx in range(x0, x0 + cell):
-                set_pixel(xx, yy, rgba)
-
-    out_layer.setPixelData(bytes(out_buf), 0, 0, out_w, out_h)
+    if np is not None:
+        src_np = np.frombuffer(src_bytes, dtype=np.uint8).reshape(src_h, src_w, bpp)
+        centers = src_np[cell // 2, cell // 2::cell, :]  # (256, 4)
+        tiled = np.broadcast_to(centers.reshape(grid, 1, grid, 1, bpp),
+                                (grid, cell, grid, cell, bpp))
+        out_buf = tiled.tobytes()
+    else:
+        # Block centres as plain 4-byte slices straight out of the source row
+        row_off = (cell // 2) * src_w * bpp
+        centers = [
+            src_bytes[i:i + bpp]
+            for i in range(row_off + (cell // 2) * bpp, row_off + src_w * bpp, cell * bpp)
+        ]
+        scanlines = []
+        for row in range(grid):
+            line = b"".join(rgba * cell for rgba in centers[row * grid:(row + 1) * grid])
+            scanlines.append(line * cell)
+        out_buf = b"".join(scanlines)
+
+    out_layer.setPixelData(out_buf, 0, 0, out_w, out_h)
     out_doc.refreshProjection()
 
     # --- Silent PNG export ---
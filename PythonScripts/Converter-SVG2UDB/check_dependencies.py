@@ -15,10 +15,10 @@ required_modules = {
     'json': 'Core Python', 
     'os': 'Core Python',
     'argparse': 'Core Python',
-    'math': 'Core Python',
     're': 'Core Python',
     'xml.etree.ElementTree': 'Core Python',
-    'typing': 'Core Python (3.5+)'
+    'typing': 'Core Python (3.5+)',
+    'numpy': 'Third-party (pip install numpy)'
 }
 
 all_ok = True
@@ -42,7 +42,8 @@ if all_ok:
     print('  py svg2udb.py --center yourfile.svg output')
 else:
     print("\n✗ SOME DEPENDENCIES MISSING")
-    print("\nYou're using an outdated Python version.")
+    print("\nInstall numpy with:  pip install numpy")
+    print("If a Core Python module is missing, you're using an outdated Python version.")
     print("Please upgrade to Python 3.5 or higher.")
 
 sys.exit(0 if all_ok else 1)
\ No newline at end of file
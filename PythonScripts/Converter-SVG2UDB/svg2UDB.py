@@ -8,102 +8,217 @@ import sys
 import json
 import os
 import argparse
-import math
+import contextlib
+import hashlib
+import io
 import re
+from concurrent.futures import ProcessPoolExecutor
 from xml.etree import ElementTree as ET
 from typing import List, Tuple, Dict
 
-def cubic_bezier_point(t: float, p0: Tuple[float, float], p1: Tuple[float, float], 
-                       p2: Tuple[float, float], p3: Tuple[float, float]) -> Tuple[float, float]:
-    """Calculate point on cubic Bézier curve at parameter t (0 to 1)"""
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Converted shapes are cached here, keyed by SVG contents + conversion settings.
+# Bump _CACHE_VERSION whenever a change to the conversion alters its output.
+_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'svg2udb')
+_CACHE_VERSION = 2
+
+# SVG path tokens: a command letter or a number (numbers may run together, e.g. "10-5" or "1.5.5")
+_PATH_TOKEN = re.compile(r'[MLCQZmlcqz]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+# Single-pass checks for curve and close-path commands in a d attribute
+_HAS_CURVE = re.compile(r'[CcQq]').search
+_HAS_CLOSE = re.compile(r'[Zz]').search
+
+# SVG elements converted to shapes, each handled by SVGToJSON._process_<tag>
+_SHAPE_TAGS = ('rect', 'path', 'polygon', 'circle', 'ellipse')
+
+# Path command -> (kind, relative); M and L both just add a vertex here
+_PATH_COMMANDS = {
+    'M': ('line', False), 'm': ('line', True),
+    'L': ('line', False), 'l': ('line', True),
+    'C': ('cubic', False), 'c': ('cubic', True),
+    'Q': ('quad', False), 'q': ('quad', True),
+    'Z': ('close', False), 'z': ('close', False),
+}
+
+def cubic_bezier_basis(t: np.ndarray) -> np.ndarray:
+    """Bernstein basis matrix (len(t), 4) of a cubic Bézier curve, one row per parameter in t"""
     mt = 1 - t
     mt2 = mt * mt
     mt3 = mt2 * mt
     t2 = t * t
     t3 = t2 * t
     
-    x = mt3 * p0[0] + 3 * mt2 * t * p1[0] + 3 * mt * t2 * p2[0] + t3 * p3[0]
-    y = mt3 * p0[1] + 3 * mt2 * t * p1[1] + 3 * mt * t2 * p2[1] + t3 * p3[1]
-    
-    return (x, y)
+    return np.stack([mt3, 3 * mt2 * t, 3 * mt * t2, t3], axis=1)
 
-def quadratic_bezier_point(t: float, p0: Tuple[float, float], p1: Tuple[float, float], 
-                           p2: Tuple[float, float]) -> Tuple[float, float]:
-    """Calculate point on quadratic Bézier curve at parameter t (0 to 1)"""
+def quadratic_bezier_basis(t: np.ndarray) -> np.ndarray:
+    """Bernstein basis matrix (len(t), 3) of a quadratic Bézier curve, one row per parameter in t"""
     mt = 1 - t
     mt2 = mt * mt
     t2 = t * t
     
-    x = mt2 * p0[0] + 2 * mt * t * p1[0] + t2 * p2[0]
-    y = mt2 * p0[1] + 2 * mt * t * p1[1] + t2 * p2[1]
-    
-    return (x, y)
+    return np.stack([mt2, 2 * mt * t, t2], axis=1)
 
-def perpendicular_distance(point: Tuple[float, float], line_start: Tuple[float, float], 
-                          line_end: Tuple[float, float]) -> float:
-    """Calculate perpendicular distance from point to line segment"""
-    x0, y0 = point
+def perpendicular_distances_sq(points: np.ndarray, line_start: np.ndarray,
+                               line_end: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Squared perpendicular distance from each of an (N, 2) array of points to a line segment,
+    scaled by the segment's squared length L2 so no division is needed.
+    Returns (scaled distances, L2); L2 is 1 for a zero-length segment.
+    """
     x1, y1 = line_start
     x2, y2 = line_end
+    rx = points[:, 0] - x1
+    ry = points[:, 1] - y1
     
     dx = x2 - x1
     dy = y2 - y1
+    l2 = dx * dx + dy * dy
     
-    if dx == 0 and dy == 0:
-        return math.sqrt((x0 - x1)**2 + (y0 - y1)**2)
-    
-    t = max(0, min(1, ((x0 - x1) * dx + (y0 - y1) * dy) / (dx * dx + dy * dy)))
+    if l2 == 0:
+        return rx * rx + ry * ry, 1.0
     
-    proj_x = x1 + t * dx
-    proj_y = y1 + t * dy
+    # |(p - p1) x (p2 - p1)|^2 is the squared distance to the line times L2;
+    # points projecting past either end measure to that endpoint instead
+    cross = rx * dy - ry * dx
+    dot = rx * dx + ry * dy
+    d = cross * cross
+    d = np.where(dot < 0, (rx * rx + ry * ry) * l2, d)
+    d = np.where(dot > l2, ((points[:, 0] - x2)**2 + (points[:, 1] - y2)**2) * l2, d)
     
-    return math.sqrt((x0 - proj_x)**2 + (y0 - proj_y)**2)
+    return d, l2
+
+def _rdp_keep_numpy(pts: np.ndarray, eps_sq: float) -> np.ndarray:
+    """Iterative RDP over an (N, 2) float64 array; returns the keep mask"""
+    n = len(pts)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[n - 1] = True
+    
+    stack = [(0, n - 1)]
+    while stack:
+        lo, hi = stack.pop()
+        if hi - lo < 2:
+            continue
+        
+        # Find point with maximum distance from line between first and last
+        d_sq, l2 = perpendicular_distances_sq(pts[lo + 1:hi], pts[lo], pts[hi])
+        i = int(d_sq.argmax())
+        
+        # If max distance is greater than epsilon, simplify both halves
+        if d_sq[i] > eps_sq * l2:
+            index = lo + 1 + i
+            keep[index] = True
+            stack.append((lo, index))
+            stack.append((index, hi))
+    
+    return keep
 
-def rdp_simplify(points: List[Tuple[float, float]], epsilon: float) -> List[Tuple[float, float]]:
+if njit is not None:
+    @njit(cache=True)
+    def _rdp_keep_kernel(pts, eps_sq):
+        """Numba version of _rdp_keep_numpy (same distances, same first-max choice)"""
+        n = pts.shape[0]
+        keep = np.zeros(n, dtype=np.bool_)
+        keep[0] = True
+        keep[n - 1] = True
+        
+        # Ranges on the stack never overlap, so n slots is always enough
+        stack = np.empty((n, 2), dtype=np.int64)
+        stack[0, 0] = 0
+        stack[0, 1] = n - 1
+        top = 1
+        while top > 0:
+            top -= 1
+            lo = stack[top, 0]
+            hi = stack[top, 1]
+            if hi - lo < 2:
+                continue
+            
+            x1 = pts[lo, 0]
+            y1 = pts[lo, 1]
+            x2 = pts[hi, 0]
+            y2 = pts[hi, 1]
+            dx = x2 - x1
+            dy = y2 - y1
+            l2 = dx * dx + dy * dy
+            
+            dmax = -1.0
+            index = lo
+            for j in range(lo + 1, hi):
+                rx = pts[j, 0] - x1
+                ry = pts[j, 1] - y1
+                if l2 == 0:
+                    d = rx * rx + ry * ry
+                else:
+                    dot = rx * dx + ry * dy
+                    if dot < 0:
+                        d = (rx * rx + ry * ry) * l2
+                    elif dot > l2:
+                        ex = pts[j, 0] - x2
+                        ey = pts[j, 1] - y2
+                        d = (ex * ex + ey * ey) * l2
+                    else:
+                        c = rx * dy - ry * dx
+                        d = c * c
+                if d > dmax:
+                    dmax = d
+                    index = j
+            
+            if dmax > eps_sq * (l2 if l2 != 0 else 1.0):
+                keep[index] = True
+                stack[top, 0] = lo
+                stack[top, 1] = index
+                stack[top + 1, 0] = index
+                stack[top + 1, 1] = hi
+                top += 2
+        
+        return keep
+else:
+    _rdp_keep_kernel = _rdp_keep_numpy
+
+def rdp_simplify(points: np.ndarray, epsilon: float) -> np.ndarray:
     """
     Ramer-Douglas-Peucker algorithm for curve simplification.
     Reduces number of points while maintaining curve shape within epsilon tolerance.
+    Iterative (explicit stack) so long curves can't hit the recursion limit.
+    Takes an (N, 2) array and returns the kept rows of it.
     """
     if len(points) < 3:
         return points
     
-    # Find point with maximum distance from line between first and last
-    dmax = 0
-    index = 0
-    end = len(points) - 1
-    
-    for i in range(1, end):
-        d = perpendicular_distance(points[i], points[0], points[end])
-        if d > dmax:
-            index = i
-            dmax = d
-    
-    # If max distance is greater than epsilon, recursively simplify
-    if dmax > epsilon:
-        # Recursive call on both segments
-        rec_results1 = rdp_simplify(points[:index + 1], epsilon)
-        rec_results2 = rdp_simplify(points[index:], epsilon)
-        
-        # Combine results (removing duplicate middle point)
-        result = rec_results1[:-1] + rec_results2
-    else:
-        # If max distance is less than epsilon, just keep endpoints
-        result = [points[0], points[end]]
-    
-    return result
+    # Distances are only compared against epsilon, so stay in squared units
+    eps_sq = epsilon * epsilon
+    pts = np.ascontiguousarray(points, dtype=np.float64)
+    return points[_rdp_keep_kernel(pts, eps_sq)]
 
 class SVGToJSON:
-    def __init__(self, svg_path: str, curve_segments: int = 32, simplify_tolerance: float = 0.5):
+    def __init__(self, svg_path: str, curve_segments: int = 32, simplify_tolerance: float = 0.5,
+                 jobs: int = 1):
         self.svg_path = svg_path
         self.curve_segments = curve_segments  # Initial sampling resolution
         self.simplify_tolerance = simplify_tolerance  # RDP simplification tolerance
+        self.jobs = jobs  # Worker processes for shape processing (1 = in this process)
         self.shapes = []
         self.document_height = 0
         
+        # Curve sample parameters t = 1/N .. 1 and their basis matrices, shared by every curve
+        t = np.arange(1, curve_segments + 1) / curve_segments
+        self._cubic_basis = cubic_bezier_basis(t)
+        self._quad_basis = quadratic_bezier_basis(t)
+        
     def parse_svg(self):
         """Parse the SVG file and extract geometry"""
-        tree = ET.parse(self.svg_path)
-        root = tree.getroot()
+        # Stream the file: shapes are handled on their start tag (attributes are
+        # complete there, and document order matches root.iter()), and every
+        # element is cleared on its end tag so no full DOM is kept in memory
+        events = ET.iterparse(self.svg_path, events=('start', 'end'))
+        _, root = next(events)
         
         # Get document height for Y-axis flip
         # Try width/height first, fall back to viewBox if they're percentages
@@ -125,38 +240,68 @@ class SVGToJSON:
         print(f"Document size: {self.document_height}px x {self.document_height}px")
         print(f"Y-axis will be flipped for Doom coordinates\n")
         
-        # Process all elements using iter() to handle namespaces properly
-        rect_count = 0
-        path_count = 0
-        poly_count = 0
-        circle_count = 0
-        ellipse_count = 0
+        # Process all elements, stripping namespaces from the tag. With several
+        # jobs, shapes are only recorded here (tag, attributes, index per tag)
+        counts = dict.fromkeys(_SHAPE_TAGS, 0)
+        records = []
         
-        for elem in root.iter():
+        for event, elem in events:
+            if event == 'end':
+                elem.clear()
+                continue
+            
             tag = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
             
-            if tag == 'rect':
-                self._process_rect(elem, rect_count)
-                rect_count += 1
-            elif tag == 'path':
-                self._process_path(elem, path_count)
-                path_count += 1
-            elif tag == 'polygon':
-                self._process_polygon(elem, poly_count)
-                poly_count += 1
-            elif tag == 'circle':
-                self._process_circle(elem, circle_count)
-                circle_count += 1
-            elif tag == 'ellipse':
-                self._process_ellipse(elem, ellipse_count)
-                ellipse_count += 1
+            if tag in counts:
+                if self.jobs > 1:
+                    records.append((tag, dict(elem.attrib), counts[tag]))
+                else:
+                    self._process_shape(tag, elem, counts[tag])
+                counts[tag] += 1
+        
+        if records:
+            self._process_parallel(records)
             
         print(f"\nExtracted {len(self.shapes)} shapes")
         
+    def _process_shape(self, tag: str, elem, idx: int):
+        """Dispatch to _process_<tag>; elem only needs .get(), so an attribute dict works too"""
+        getattr(self, '_process_' + tag)(elem, idx)
+    
+    def _process_parallel(self, records: List[tuple]):
+        """Process recorded shapes in worker processes, keeping document order and output"""
+        chunksize = max(1, len(records) // (self.jobs * 4))
+        initargs = (self.curve_segments, self.simplify_tolerance, self.document_height)
+        
+        with ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker,
+                                 initargs=initargs) as pool:
+            for shapes, log in pool.map(_process_in_worker, records, chunksize=chunksize):
+                sys.stdout.write(log)
+                self.shapes.extend(shapes)
+    
     def _flip_y(self, y: float) -> float:
         """Flip Y coordinate from SVG (top-left origin) to Doom (bottom-left origin)"""
         return self.document_height - y
     
+    def _to_grid(self, points) -> np.ndarray:
+        """Flip Y and round SVG (x, y) points to an (N, 2) int32 vertex array in one pass"""
+        verts = np.array(points, dtype=np.float64).reshape(-1, 2)
+        verts[:, 1] = self.document_height - verts[:, 1]
+        np.rint(verts, out=verts)
+        return verts.astype(np.int32)
+    
+    def _sample_curves(self, basis: np.ndarray, ctrl: np.ndarray) -> np.ndarray:
+        """
+        Sample K Bézier curves (control points as a (K, n) complex array, x + yj) at every
+        t at once, returning their flipped, rounded vertices in curve order as a (K*N, 2) array
+        """
+        # Complex points evaluate x and y in one product: (K, n) @ (n, N) -> (K, N)
+        z = ctrl @ basis.T
+        
+        xs = np.rint(z.real).astype(np.int32).ravel()
+        ys = np.rint(self.document_height - z.imag).astype(np.int32).ravel()
+        return np.stack([xs, ys], axis=1)
+    
     def _process_rect(self, rect, idx):
         """Convert SVG rect to vertex list"""
         x = float(rect.get('x', 0))
@@ -165,12 +310,12 @@ class SVGToJSON:
         height = float(rect.get('height', 0))
         
         # Create 4 vertices (clockwise from top-left)
-        vertices = [
-            [round(x), round(self._flip_y(y))],                      # top-left
-            [round(x + width), round(self._flip_y(y))],              # top-right
-            [round(x + width), round(self._flip_y(y + height))],     # bottom-right
-            [round(x), round(self._flip_y(y + height))]              # bottom-left
-        ]
+        vertices = self._to_grid([
+            [x, y],                      # top-left
+            [x + width, y],              # top-right
+            [x + width, y + height],     # bottom-right
+            [x, y + height]              # bottom-left
+        ])
         
         self.shapes.append({
             'type': 'rect',
@@ -189,7 +334,7 @@ class SVGToJSON:
             return
         
         # Check if path is closed
-        is_closed = 'Z' in d or 'z' in d
+        is_closed = _HAS_CLOSE(d) is not None
         
         # Also check style attribute for fill:none (indicates open path)
         style = path.get('style', '')
@@ -199,31 +344,11 @@ class SVGToJSON:
         print(f"  Processing path {idx}... ({'closed' if is_closed else 'OPEN'})")
         
         # Check for curve commands
-        has_curves = any(cmd in d for cmd in ['C', 'c', 'Q', 'q'])
+        has_curves = _HAS_CURVE(d) is not None
         
         if has_curves:
             print(f"    Converting curves to {self.curve_segments} segments per curve")
-            vertices_raw = self._parse_path_with_curves(d)
-            
-            # Step 1: Snap to integer grid and remove duplicates
-            vertices_snapped = []
-            prev_point = None
-            for v in vertices_raw:
-                point = (round(v[0]), round(v[1]))
-                if point != prev_point:  # Remove consecutive duplicates
-                    vertices_snapped.append(point)
-                    prev_point = point
-            
-            print(f"    Snapped to grid: {len(vertices_raw)} -> {len(vertices_snapped)} unique vertices")
-            
-            # Step 2: Apply RDP simplification to remove collinear/redundant points
-            if self.simplify_tolerance > 0 and len(vertices_snapped) > 2:
-                points_float = [(float(p[0]), float(p[1])) for p in vertices_snapped]
-                simplified = rdp_simplify(points_float, self.simplify_tolerance)
-                vertices = [[int(p[0]), int(p[1])] for p in simplified]
-                print(f"    Simplified: {len(vertices_snapped)} -> {len(vertices)} vertices (tolerance: {self.simplify_tolerance})")
-            else:
-                vertices = [[v[0], v[1]] for v in vertices_snapped]
+            vertices = self._snap_and_simplify(self._parse_path_with_curves(d))
             
             if len(vertices) >= 2:  # Open paths only need 2 vertices minimum
                 self.shapes.append({
@@ -238,9 +363,7 @@ class SVGToJSON:
             return
         
         # No curves - parse as straight lines
-        d_spaced = re.sub(r'([MLZmlz])', r' \1 ', d)
-        d_spaced = d_spaced.replace(',', ' ')
-        commands = d_spaced.split()
+        commands = _PATH_TOKEN.findall(d)
         
         vertices = []
         current_pos = None
@@ -258,7 +381,7 @@ class SVGToJSON:
                             x += current_pos[0]
                             y += current_pos[1]
                         current_pos = (x, y)
-                        vertices.append([round(x), round(self._flip_y(y))])
+                        vertices.append([x, y])
                     except ValueError:
                         pass
                 i += 3
@@ -272,7 +395,7 @@ class SVGToJSON:
                             x += current_pos[0]
                             y += current_pos[1]
                         current_pos = (x, y)
-                        vertices.append([round(x), round(self._flip_y(y))])
+                        vertices.append([x, y])
                     except ValueError:
                         pass
                 i += 3
@@ -284,6 +407,8 @@ class SVGToJSON:
             else:
                 i += 1
         
+        vertices = self._to_grid(vertices)
+        
         if len(vertices) >= 2:  # Open paths need at least 2 vertices
             min_verts = 3 if is_closed else 2
             if len(vertices) >= min_verts:
@@ -299,107 +424,89 @@ class SVGToJSON:
         else:
             print(f"    ⚠ Not enough vertices ({len(vertices)})")
     
-    def _parse_path_with_curves(self, d: str) -> List[List[int]]:
-        """Parse SVG path with curves, converting to line segments"""
+    def _snap_and_simplify(self, vertices_raw: np.ndarray) -> np.ndarray:
+        """Reduce densely sampled vertices (already on the integer grid) for Doom"""
+        # Step 1: Remove consecutive duplicates
+        mask = np.ones(len(vertices_raw), dtype=bool)
+        mask[1:] = np.any(vertices_raw[1:] != vertices_raw[:-1], axis=1)
+        vertices_snapped = vertices_raw[mask]
+        
+        print(f"    Snapped to grid: {len(vertices_raw)} -> {len(vertices_snapped)} unique vertices")
+        
+        # Step 2: Apply RDP simplification to remove collinear/redundant points
+        if self.simplify_tolerance > 0 and len(vertices_snapped) > 2:
+            vertices = rdp_simplify(vertices_snapped, self.simplify_tolerance)
+            print(f"    Simplified: {len(vertices_snapped)} -> {len(vertices)} vertices (tolerance: {self.simplify_tolerance})")
+        else:
+            vertices = vertices_snapped
+        
+        return vertices
+    
+    def _parse_path_with_curves(self, d: str) -> np.ndarray:
+        """Parse SVG path with curves, converting to line segments (an (N, 2) int32 array)"""
         # Tokenize the path
-        d_clean = d.replace(',', ' ')
-        d_clean = re.sub(r'([MLCQZmlcqz])', r' \1 ', d_clean)
-        tokens = [t for t in d_clean.split() if t]
+        tokens = _PATH_TOKEN.findall(d)
         
-        vertices = []
+        pieces = []  # vertex arrays in path order
+        vertices = []  # M/L points (SVG coordinates) since the last curve batch
         current_pos = (0.0, 0.0)
         i = 0
         
+        # Consecutive curves of one kind are buffered and sampled in one batch
+        run_basis = None
+        run_ctrl = []
+        
+        def flush():
+            nonlocal run_basis
+            if run_ctrl:
+                if vertices:
+                    pieces.append(self._to_grid(vertices))
+                    vertices.clear()
+                pieces.append(self._sample_curves(run_basis, np.array(run_ctrl)))
+                run_ctrl.clear()
+            run_basis = None
+        
         while i < len(tokens):
-            cmd = tokens[i]
+            kind, relative = _PATH_COMMANDS.get(tokens[i], (None, False))
             
-            if cmd == 'M':  # Absolute move
-                x, y = float(tokens[i+1]), float(tokens[i+2])
-                current_pos = (x, y)
-                vertices.append([round(x), round(self._flip_y(y))])
-                i += 3
-                
-            elif cmd == 'm':  # Relative move
-                dx, dy = float(tokens[i+1]), float(tokens[i+2])
-                current_pos = (current_pos[0] + dx, current_pos[1] + dy)
-                vertices.append([round(current_pos[0]), round(self._flip_y(current_pos[1]))])
-                i += 3
-                
-            elif cmd == 'L':  # Absolute line
-                x, y = float(tokens[i+1]), float(tokens[i+2])
-                current_pos = (x, y)
-                vertices.append([round(x), round(self._flip_y(y))])
-                i += 3
-                
-            elif cmd == 'l':  # Relative line
-                dx, dy = float(tokens[i+1]), float(tokens[i+2])
-                current_pos = (current_pos[0] + dx, current_pos[1] + dy)
-                vertices.append([round(current_pos[0]), round(self._flip_y(current_pos[1]))])
-                i += 3
-                
-            elif cmd == 'C':  # Absolute cubic Bézier
-                p0 = current_pos
-                p1 = (float(tokens[i+1]), float(tokens[i+2]))
-                p2 = (float(tokens[i+3]), float(tokens[i+4]))
-                p3 = (float(tokens[i+5]), float(tokens[i+6]))
-                
-                # Approximate curve with line segments
-                for j in range(1, self.curve_segments + 1):
-                    t = j / self.curve_segments
-                    pt = cubic_bezier_point(t, p0, p1, p2, p3)
-                    vertices.append([round(pt[0]), round(self._flip_y(pt[1]))])
-                
-                current_pos = p3
-                i += 7
-                
-            elif cmd == 'c':  # Relative cubic Bézier
-                p0 = current_pos
-                p1 = (current_pos[0] + float(tokens[i+1]), current_pos[1] + float(tokens[i+2]))
-                p2 = (current_pos[0] + float(tokens[i+3]), current_pos[1] + float(tokens[i+4]))
-                p3 = (current_pos[0] + float(tokens[i+5]), current_pos[1] + float(tokens[i+6]))
-                
-                for j in range(1, self.curve_segments + 1):
-                    t = j / self.curve_segments
-                    pt = cubic_bezier_point(t, p0, p1, p2, p3)
-                    vertices.append([round(pt[0]), round(self._flip_y(pt[1]))])
-                
-                current_pos = p3
-                i += 7
-                
-            elif cmd == 'Q':  # Absolute quadratic Bézier
-                p0 = current_pos
-                p1 = (float(tokens[i+1]), float(tokens[i+2]))
-                p2 = (float(tokens[i+3]), float(tokens[i+4]))
-                
-                for j in range(1, self.curve_segments + 1):
-                    t = j / self.curve_segments
-                    pt = quadratic_bezier_point(t, p0, p1, p2)
-                    vertices.append([round(pt[0]), round(self._flip_y(pt[1]))])
-                
-                current_pos = p2
-                i += 5
-                
-            elif cmd == 'q':  # Relative quadratic Bézier
-                p0 = current_pos
-                p1 = (current_pos[0] + float(tokens[i+1]), current_pos[1] + float(tokens[i+2]))
-                p2 = (current_pos[0] + float(tokens[i+3]), current_pos[1] + float(tokens[i+4]))
-                
-                for j in range(1, self.curve_segments + 1):
-                    t = j / self.curve_segments
-                    pt = quadratic_bezier_point(t, p0, p1, p2)
-                    vertices.append([round(pt[0]), round(self._flip_y(pt[1]))])
-                
-                current_pos = p2
-                i += 5
-                
-            elif cmd in ['Z', 'z']:  # Close path
+            if kind is None:  # stray number or unsupported command
                 i += 1
+                continue
+            
+            if kind == 'close':  # Close path
                 break
-                
-            else:
-                i += 1
+            
+            ox, oy = current_pos if relative else (0.0, 0.0)
+            
+            if kind == 'line':  # Move / line (absolute or relative)
+                flush()
+                x, y = ox + float(tokens[i+1]), oy + float(tokens[i+2])
+                current_pos = (x, y)
+                vertices.append([x, y])
+                i += 3
+                continue
+            
+            # Cubic / quadratic Bézier
+            basis = self._cubic_basis if kind == 'cubic' else self._quad_basis
+            if basis is not run_basis:
+                flush()
+                run_basis = basis
+            
+            n = basis.shape[1] - 1
+            ctrl = [complex(*current_pos)]
+            for k in range(n):
+                ctrl.append(complex(ox + float(tokens[i + 1 + 2*k]), oy + float(tokens[i + 2 + 2*k])))
+            
+            run_ctrl.append(ctrl)
+            current_pos = (ctrl[-1].real, ctrl[-1].imag)
+            i += 1 + 2 * n
         
-        return vertices
+        flush()
+        if vertices:
+            pieces.append(self._to_grid(vertices))
+        if not pieces:
+            return np.empty((0, 2), dtype=np.int32)
+        return np.concatenate(pieces)
     
     def _process_polygon(self, polygon, idx):
         """Convert SVG polygon to vertex list"""
@@ -407,14 +514,8 @@ class SVGToJSON:
         if not points:
             return
             
-        # Parse points attribute
-        coords = [float(x) for x in points.replace(',', ' ').split()]
-        vertices = []
-        
-        for i in range(0, len(coords), 2):
-            x = coords[i]
-            y = coords[i+1]
-            vertices.append([round(x), round(self._flip_y(y))])
+        # Parse points attribute in one pass, then flip and round all points at once
+        vertices = self._to_grid(np.fromstring(points.replace(',', ' '), dtype=np.float64, sep=' '))
         
         if len(vertices) >= 3:
             self.shapes.append({
@@ -425,8 +526,15 @@ class SVGToJSON:
             })
             print(f"  Polygon {idx}: {len(vertices)} vertices")
     
+    def _ellipse_vertices(self, cx: float, cy: float, rx: float, ry: float) -> np.ndarray:
+        """Sample an ellipse at curve_segments angles and reduce it like a curved path"""
+        theta = np.arange(self.curve_segments) * (2 * np.pi / self.curve_segments)
+        # Counter-clockwise in Doom coordinates (SVG y points down)
+        points = np.stack([cx + rx * np.cos(theta), cy - ry * np.sin(theta)], axis=1)
+        return self._snap_and_simplify(self._to_grid(points))
+    
     def _process_circle(self, circle, idx):
-        """Store SVG circle as parametric data for runtime curve generation"""
+        """Convert SVG circle to vertex list, sampled like a curve"""
         cx = float(circle.get('cx', 0))
         cy = float(circle.get('cy', 0))
         r = float(circle.get('r', 0))
@@ -439,14 +547,12 @@ class SVGToJSON:
         self.shapes.append({
             'type': 'circle',
             'name': f'circle_{idx}',
-            'cx': round(cx),
-            'cy': round(self._flip_y(cy)),
-            'r': round(r),
+            'vertices': self._ellipse_vertices(cx, cy, r, r),
             'closed': True
         })
     
     def _process_ellipse(self, ellipse, idx):
-        """Store SVG ellipse as parametric data for runtime curve generation"""
+        """Convert SVG ellipse to vertex list, sampled like a curve"""
         cx = float(ellipse.get('cx', 0))
         cy = float(ellipse.get('cy', 0))
         rx = float(ellipse.get('rx', 0))
@@ -460,20 +566,42 @@ class SVGToJSON:
         self.shapes.append({
             'type': 'ellipse',
             'name': f'ellipse_{idx}',
-            'cx': round(cx),
-            'cy': round(self._flip_y(cy)),
-            'rx': round(rx),
-            'ry': round(ry),
+            'vertices': self._ellipse_vertices(cx, cy, rx, ry),
             'closed': True
         })
     
+    def finalize(self, center: bool = True):
+        """
+        Apply the centering offset (Affinity center -> Doom 0,0) to every shape in one
+        vectorized pass per shape (vertices stay (N, 2) int32 arrays until written out)
+        """
+        # Affinity center is at (2048, 2048) for 4096x4096 document
+        offset = int(self.document_height / 2) if center else 0
+        
+        if offset:
+            for shape in self.shapes:
+                shape['vertices'] -= offset
+    
+    def save_shapes(self, path: str):
+        """Write the finalized shapes (and document height) to a JSON cache file"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'document_height': self.document_height, 'shapes': self.shapes},
+                      f, separators=(',', ':'), default=np.ndarray.tolist)
+        os.replace(tmp_path, path)  # never leave a half-written cache entry
+    
+    def load_shapes(self, path: str):
+        """Load finalized shapes written by save_shapes (instead of parse_svg + finalize)"""
+        with open(path) as f:
+            data = json.load(f)
+        self.document_height = data['document_height']
+        self.shapes = data['shapes']
+    
     def write_udb_script(self, output_path: str, script_name: str):
         """Write UDB script with embedded geometry data"""
         
-        # Build JavaScript array of shapes
-        shapes_js = "const shapes = " + json.dumps(self.shapes, indent=2) + ";\n\n"
-        
-        script_content = f'''/// <reference path="../udbscript.d.ts" />
+        header = f'''/// <reference path="../udbscript.d.ts" />
 
 `#version 5`;
 `#name svg2UDB - {script_name}`;
@@ -515,17 +643,12 @@ light_level
     type = 0; // integer
     default = 160;
 }}
-
-curve_segments
-{{
-    description = "Curve resolution (segments for circles/curves)";
-    type = 0; // integer
-    default = 64;
-}}
 `;
 
 // Embedded geometry data from SVG
-{shapes_js}
+'''
+        
+        footer = f'''
 
 // Main import function
 function importGeometry() {{
@@ -538,42 +661,10 @@ function importGeometry() {{
     const floorTex = UDB.ScriptOptions.floor_texture;
     const ceilingTex = UDB.ScriptOptions.ceiling_texture;
     const lightLevel = UDB.ScriptOptions.light_level;
-    const curveSegments = UDB.ScriptOptions.curve_segments;
-    
-    // Helper function to generate circle/ellipse vertices
-    function generateCurveVertices(shape, segments) {{
-        const vertices = [];
-        
-        if (shape.type === 'circle') {{
-            for (let i = 0; i < segments; i++) {{
-                const angle = 2 * Math.PI * i / segments;
-                const x = shape.cx + shape.r * Math.cos(angle);
-                const y = shape.cy + shape.r * Math.sin(angle);
-                vertices.push([Math.round(x), Math.round(y)]);
-            }}
-        }} else if (shape.type === 'ellipse') {{
-            for (let i = 0; i < segments; i++) {{
-                const angle = 2 * Math.PI * i / segments;
-                const x = shape.cx + shape.rx * Math.cos(angle);
-                const y = shape.cy + shape.ry * Math.sin(angle);
-                vertices.push([Math.round(x), Math.round(y)]);
-            }}
-        }}
-        
-        return vertices;
-    }}
     
-    // Process each shape
+    // Process each shape (all vertices are pre-calculated, circles/ellipses included)
     for (const shape of shapes) {{
-        // Get vertices - either pre-calculated or generate from parametric data
-        let shapeVertices;
-        if (shape.vertices) {{
-            shapeVertices = shape.vertices;
-        }} else if (shape.type === 'circle' || shape.type === 'ellipse') {{
-            shapeVertices = generateCurveVertices(shape, curveSegments);
-        }} else {{
-            continue;
-        }}
+        const shapeVertices = shape.vertices;
         
         if (shapeVertices.length < 2) {{
             continue;
@@ -656,8 +747,15 @@ function importGeometry() {{
 importGeometry();
 '''
         
+        # Stream the shapes array straight into the file instead of building
+        # the whole script as one string first
         with open(output_path, 'w') as f:
-            f.write(script_content)
+            f.write(header)
+            f.write("const shapes = ")
+            # Vertex arrays only become nested lists here, as they are encoded
+            json.dump(self.shapes, f, separators=(',', ':'), default=np.ndarray.tolist)
+            f.write(";\n\n")
+            f.write(footer)
         
         print(f"\n✓ UDB script written: {output_path}")
         print(f"  {len(self.shapes)} shapes embedded in script")
@@ -666,8 +764,39 @@ importGeometry();
         print(f"  1. Copy to UDB's Scripts folder")
         print(f"  2. In UDB: Tools → Run Script → svg2UDB - {script_name}")
         print(f"  3. Configure options and click OK")
-        print(f"\nNote: 'Curve resolution' in UDB only affects circles/ellipses.")
-        print(f"      Bézier curves use --curve-segments at Python conversion time.")
+        print(f"\nNote: curves, circles and ellipses use --curve-segments at Python conversion time.")
+
+# --- Worker process state for --jobs ---
+# Each worker keeps one converter with the document's settings; shapes and their
+# progress messages go back to the parent so they come out in document order.
+_worker = None
+
+
+def _init_worker(curve_segments, simplify_tolerance, document_height):
+    global _worker
+    _worker = SVGToJSON('', curve_segments, simplify_tolerance)
+    _worker.document_height = document_height
+
+
+def _process_in_worker(record):
+    tag, attrib, idx = record
+    _worker.shapes = []
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        _worker._process_shape(tag, attrib, idx)
+    return _worker.shapes, log.getvalue()
+
+
+def shape_cache_path(svg_path: str, curve_segments: int, simplify_tolerance: float,
+                     center: bool) -> str:
+    """Cache file for an SVG's converted shapes: a hash of its bytes and the settings"""
+    h = hashlib.blake2b(digest_size=20)
+    with open(svg_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    h.update(repr((_CACHE_VERSION, curve_segments, simplify_tolerance, center)).encode())
+    return os.path.join(_CACHE_DIR, h.hexdigest() + '.json')
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -698,8 +827,15 @@ Use --absolute to disable centering.
                         help='Initial curve sampling resolution (default: 2048). High values recommended since grid snapping removes duplicates.')
     parser.add_argument('--simplify', type=float, default=1.5,
                         help='Curve simplification tolerance (default: 1.5). Lower = more accurate but more vertices. 0 = no simplification.')
+    parser.add_argument('--no-cache', action='store_true',
+                        help=f'Always convert the SVG instead of reusing cached shapes from {_CACHE_DIR}')
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                        help='Process shapes in N worker processes (default: 1, 0 = one per CPU core)')
     
     args = parser.parse_args()
+    if args.jobs < 0:
+        parser.error('--jobs must be 0 or greater')
+    jobs = args.jobs or os.cpu_count() or 1
     
     # Center by default unless --absolute is specified
     args.center = not args.absolute
@@ -727,30 +863,39 @@ Use --absolute to disable centering.
         print(f"Centering:   YES (Affinity center -> Doom 0,0) [default]")
     if args.directory != '.':
         print(f"Directory:   {args.directory}")
+    if jobs > 1:
+        print(f"Jobs:        {jobs}")
     print()
     
     try:
-        converter = SVGToJSON(args.input, curve_segments=args.curve_segments, simplify_tolerance=args.simplify)
-        converter.parse_svg()
-        
-        # Apply centering offset if requested
-        if args.center:
-            # Affinity center is at (2048, 2048) for 4096x4096 document
-            center_x = converter.document_height / 2
-            center_y = converter.document_height / 2
+        converter = SVGToJSON(args.input, curve_segments=args.curve_segments, simplify_tolerance=args.simplify,
+                              jobs=jobs)
+        
+        cache_path = None
+        if not args.no_cache:
+            cache_path = shape_cache_path(args.input, args.curve_segments, args.simplify, args.center)
+        
+        if cache_path and os.path.exists(cache_path):
+            converter.load_shapes(cache_path)
+            print(f"Using cached shapes: {cache_path}")
+            print(f"  {len(converter.shapes)} shapes (use --no-cache to convert again)")
+        else:
+            converter.parse_svg()
+            
+            # Apply centering offset if requested
+            if args.center:
+                center_x = converter.document_height / 2
+                center_y = converter.document_height / 2
+                
+                print(f"Applying center offset: -{center_x}, -{center_y}")
             
-            print(f"Applying center offset: -{center_x}, -{center_y}")
+            converter.finalize(center=args.center)
             
-            for shape in converter.shapes:
-                if 'vertices' in shape:
-                    # Shape with pre-calculated vertices
-                    for vertex in shape['vertices']:
-                        vertex[0] -= int(center_x)
-                        vertex[1] -= int(center_y)
-                elif shape['type'] in ['circle', 'ellipse']:
-                    # Parametric shape - offset center
-                    shape['cx'] -= int(center_x)
-                    shape['cy'] -= int(center_y)
+            if cache_path:
+                try:
+                    converter.save_shapes(cache_path)
+                except OSError as e:
+                    print(f"⚠ Could not write shape cache: {e}")
         
         converter.write_udb_script(output_path, script_name)
         
@@ -4,9 +4,29 @@ WAD to SVG Converter
 Extracts Doom maps at 1:1 scale (1 Doom unit = 1 SVG point)
 """
 
+import contextlib
+import io
+import mmap
+import os
 import struct
 import argparse
-from typing import List, Optional
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+import numpy as np
+
+# WAD header (magic, numlumps, diroffset) and directory entry (filepos, size, name)
+_WAD_HEADER = struct.Struct("<4sII")
+_WAD_DIR_ENTRY = np.dtype([("offset", "<u4"), ("size", "<u4"), ("name", "S8")])
+
+# On-disk map lump records (little-endian), read straight from the lump bytes
+VERTEX_DTYPE = np.dtype([("x", "<i2"), ("y", "<i2")])
+LINEDEF_DTYPE = np.dtype([
+    ("v1", "<u2"), ("v2", "<u2"),
+    ("flags", "<u2"), ("special", "<u2"), ("tag", "<u2"),
+    ("side1", "<u2"), ("side2", "<u2"),
+])
 
 
 class WADReader:
@@ -14,42 +34,72 @@ class WADReader:
 
     def __init__(self, wad_path: str):
         self.wad_path = wad_path
-        self.dir = []
-        self._read_wad()
 
-    def _read_wad(self):
-        with open(self.wad_path, "rb") as f:
-            wad_type = f.read(4).decode("ascii", errors="ignore")
-            num_lumps = struct.unpack("<I", f.read(4))[0]
-            dir_offset = struct.unpack("<I", f.read(4))[0]
+        # Map the file once; the directory and lumps are read straight from the mapping
+        with open(wad_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < _WAD_HEADER.size:
+                raise ValueError(f"Not a valid WAD file: {wad_path}")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
-            print(f"WAD Type: {wad_type}")
-            print(f"Number of lumps: {num_lumps}")
+        self._read_wad()
 
-            f.seek(dir_offset)
-            for _ in range(num_lumps):
-                offset = struct.unpack("<I", f.read(4))[0]
-                size = struct.unpack("<I", f.read(4))[0]
-                name = f.read(8).rstrip(b"\x00").decode("ascii", errors="ignore")
-                self.dir.append({"name": name, "offset": offset, "size": size})
+    def _read_wad(self):
+        wad_type, num_lumps, dir_offset = _WAD_HEADER.unpack_from(self._mm, 0)
+        wad_type = wad_type.decode("ascii", errors="ignore")
+
+        print(f"WAD Type: {wad_type}")
+        print(f"Number of lumps: {num_lumps}")
+
+        # Directory as parallel arrays (lump names are NUL-padded bytes). The
+        # entries are copied out of the mapping so close() never sees a live export
+        dir_end = dir_offset + num_lumps * _WAD_DIR_ENTRY.itemsize
+        entries = np.frombuffer(self._mm[dir_offset:dir_end], dtype=_WAD_DIR_ENTRY, count=num_lumps)
+        self.names = entries["name"]
+        self.offsets = entries["offset"]
+        self.sizes = entries["size"]
+        self._maps = None
+        self._first_index = None
+
+    def close(self):
+        """Unmap the WAD file"""
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def find_lump(self, name: str, start: int = 0, end: Optional[int] = None) -> Optional[int]:
+        """Index of the first lump called name in [start, end), or None"""
+        if start == 0 and end is None:
+            # Whole-directory lookups (one per map with --all) go through a
+            # {name: first index} dict built on first use
+            if self._first_index is None:
+                index = {}
+                for i, lump_name in enumerate(self.names.tolist()):
+                    index.setdefault(lump_name, i)
+                self._first_index = index
+            return self._first_index.get(name.encode("ascii"))
+        hits = np.flatnonzero(self.names[start:end] == name.encode("ascii"))
+        return start + int(hits[0]) if len(hits) else None
 
     def get_lump_at(self, index: int) -> Optional[bytes]:
-        if index < 0 or index >= len(self.dir):
+        if index < 0 or index >= len(self.names):
             return None
-        lump = self.dir[index]
-        with open(self.wad_path, "rb") as f:
-            f.seek(lump["offset"])
-            return f.read(lump["size"])
-
-    def list_maps(self) -> List[str]:
-        maps = []
-        for e in self.dir:
-            name = e["name"]
-            is_doom1 = (name.startswith("E") and len(name) == 4 and name[2] == "M")
-            is_doom2 = (name.startswith("MAP") and len(name) == 5)
-            if is_doom1 or is_doom2:
-                maps.append(name)
-        return sorted(set(maps))
+        offset = int(self.offsets[index])
+        return self._mm[offset:offset + int(self.sizes[index])]
+
+    def list_maps(self) -> Tuple[str, ...]:
+        """Sorted map marker names (ExMy / MAPxx); the directory is only scanned once"""
+        if self._maps is None:
+            names = self.names
+            lengths = np.char.str_len(names)
+            is_doom1 = np.char.startswith(names, b"E") & (lengths == 4) & (np.char.find(names, b"M", 2, 3) == 2)
+            is_doom2 = np.char.startswith(names, b"MAP") & (lengths == 5)
+            found = np.unique(names[is_doom1 | is_doom2])
+            self._maps = tuple(name.decode("ascii", errors="ignore") for name in found.tolist())
+        return self._maps
 
 
 class DoomMap:
@@ -58,26 +108,18 @@ class DoomMap:
     def __init__(self, wad: WADReader, map_name: str):
         self.wad = wad
         self.map_name = map_name.upper()
-        self.vertices = []
-        self.linedefs = []
+        self.vertices = np.empty(0, dtype=VERTEX_DTYPE)
+        self.linedefs = np.empty(0, dtype=LINEDEF_DTYPE)
         self._load_map()
 
     def _load_map(self):
-        map_index = None
-        for i, e in enumerate(self.wad.dir):
-            if e["name"] == self.map_name:
-                map_index = i
-                break
+        map_index = self.wad.find_lump(self.map_name)
         if map_index is None:
             raise ValueError(f"Map {self.map_name} not found in WAD")
 
         def find_after(expected: str, max_ahead: int = 16) -> Optional[int]:
             start = map_index + 1
-            end = min(start + max_ahead, len(self.wad.dir))
-            for j in range(start, end):
-                if self.wad.dir[j]["name"] == expected:
-                    return j
-            return None
+            return self.wad.find_lump(expected, start, start + max_ahead)
 
         vtx_i = find_after("VERTEXES")
         ldf_i = find_after("LINEDEFS")
@@ -85,24 +127,15 @@ class DoomMap:
         if vtx_i is not None:
             data = self.wad.get_lump_at(vtx_i)
             if data:
-                count = len(data) // 4
-                for i in range(count):
-                    x, y = struct.unpack("<hh", data[i * 4:(i + 1) * 4])
-                    self.vertices.append((x, y))
+                count = len(data) // VERTEX_DTYPE.itemsize
+                self.vertices = np.frombuffer(data, dtype=VERTEX_DTYPE, count=count)
         print(f"  Loaded {len(self.vertices)} vertices")
 
         if ldf_i is not None:
             data = self.wad.get_lump_at(ldf_i)
             if data:
-                count = len(data) // 14
-                for i in range(count):
-                    off = i * 14
-                    v1, v2, flags, special, tag, side1, side2 = struct.unpack("<7H", data[off:off + 14])
-                    self.linedefs.append({
-                        "v1": v1, "v2": v2,
-                        "flags": flags, "special": special, "tag": tag,
-                        "side1": side1, "side2": side2
-                    })
+                count = len(data) // LINEDEF_DTYPE.itemsize
+                self.linedefs = np.frombuffer(data, dtype=LINEDEF_DTYPE, count=count)
         print(f"  Loaded {len(self.linedefs)} linedefs")
 
 
@@ -119,14 +152,12 @@ def map_to_svg(
     (0,0) in Doom = (canvas_size/2, canvas_size/2) in SVG
     """
     verts = doom_map.vertices
-    if not verts:
+    if len(verts) == 0:
         raise ValueError("No vertices")
 
-    xs = [v[0] for v in verts]
-    ys = [v[1] for v in verts]
-
-    min_x, max_x = min(xs), max(xs)
-    min_y, max_y = min(ys), max(ys)
+    # Plain ints: int16 differences (map_width/height) could overflow
+    min_x, max_x = int(verts["x"].min()), int(verts["x"].max())
+    min_y, max_y = int(verts["y"].min()), int(verts["y"].max())
 
     map_width = max_x - min_x
     map_height = max_y - min_y
@@ -137,36 +168,38 @@ def map_to_svg(
     # Doom (0,0) maps to center of canvas (2048, 2048 in 4096×4096)
     canvas_center = canvas_size / 2
 
-    with open(out_file, "w", encoding="utf-8") as f:
-        f.write(
-            f'<?xml version="1.0" encoding="UTF-8" standalone="no"?>'
-            f'<svg xmlns="http://www.w3.org/2000/svg" '
-            f'width="{canvas_size}px" height="{canvas_size}px">\n'
-        )
-        f.write(f'<!-- Map: {doom_map.map_name} | 1:1 scale | Doom (0,0) = SVG ({canvas_center},{canvas_center}) -->\n\n')
-
-        if background:
-            f.write(f'<rect width="{canvas_size}" height="{canvas_size}" fill="{background}"/>\n\n')
-
-        for ld in doom_map.linedefs:
-            if ld["v1"] >= len(verts) or ld["v2"] >= len(verts):
-                continue
-
-            v1, v2 = verts[ld["v1"]], verts[ld["v2"]]
-
-            # Absolute coordinates: Doom (x,y) -> SVG (canvas_center + x, canvas_center - y)
-            x1 = canvas_center + v1[0]
-            y1 = canvas_center - v1[1]  # Flip Y
-            x2 = canvas_center + v2[0]
-            y2 = canvas_center - v2[1]  # Flip Y
-
-            f.write(
-                f'<line x1="{x1:.1f}" y1="{y1:.1f}" '
-                f'x2="{x2:.1f}" y2="{y2:.1f}" '
-                f'stroke="{stroke}" stroke-width="{line_width}"/>\n'
-            )
-
-        f.write("</svg>\n")
+    # Assemble the whole document, then encode and write it in one call
+    parts = [
+        f'<?xml version="1.0" encoding="UTF-8" standalone="no"?>'
+        f'<svg xmlns="http://www.w3.org/2000/svg" '
+        f'width="{canvas_size}px" height="{canvas_size}px">\n',
+        f'<!-- Map: {doom_map.map_name} | 1:1 scale | Doom (0,0) = SVG ({canvas_center},{canvas_center}) -->\n\n',
+    ]
+
+    if background:
+        parts.append(f'<rect width="{canvas_size}" height="{canvas_size}" fill="{background}"/>\n\n')
+
+    # Absolute coordinates: Doom (x,y) -> SVG (canvas_center + x, canvas_center - y),
+    # worked out once per vertex on the int16 field views
+    svg_x = canvas_center + verts["x"]
+    svg_y = canvas_center - verts["y"]  # Flip Y
+
+    # Format each vertex once as a line start (x1/y1) and a line end (x2/y2 +
+    # stroke attributes); lines are then a gather of two preformatted strings
+    # instead of four %.1f conversions per linedef
+    tail = f'stroke="{stroke}" stroke-width="{line_width}"/>\n'
+    xy = list(zip(svg_x.tolist(), svg_y.tolist()))
+    starts = np.array(['<line x1="%.1f" y1="%.1f" ' % p for p in xy], dtype=object)
+    ends = np.array(['x2="%.1f" y2="%.1f" ' % p + tail for p in xy], dtype=object)
+
+    # Skip linedefs that reference missing vertices, then gather all endpoints at once
+    lds = doom_map.linedefs
+    lds = lds[(lds["v1"] < len(verts)) & (lds["v2"] < len(verts))]
+    parts.extend((starts[lds["v1"]] + ends[lds["v2"]]).tolist())
+    parts.append("</svg>\n")
+
+    with open(out_file, "wb") as f:
+        f.write("".join(parts).encode("utf-8"))
 
     print(f"  ✓ {out_file}")
     print(f"  Doom (0,0) = SVG ({canvas_center},{canvas_center})")
@@ -178,6 +211,28 @@ def mapnum_to_name(n: int) -> str:
     return f"MAP{n:02d}"
 
 
+# --- Worker process state for --jobs ---
+# Each worker maps the WAD once; every map's progress messages go back to the
+# parent so they come out in the same order as a serial export.
+_worker_wad = None
+
+
+def _init_worker(wad_path: str):
+    global _worker_wad
+    with contextlib.redirect_stdout(io.StringIO()):
+        _worker_wad = WADReader(wad_path)
+
+
+def _export_in_worker(job) -> str:
+    map_name, out_file, canvas_size, line_width, background, stroke = job
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        print(f"\n{map_name}:")
+        doom_map = DoomMap(_worker_wad, map_name)
+        map_to_svg(doom_map, out_file, canvas_size, line_width, background, stroke)
+    return log.getvalue()
+
+
 def main():
     parser = argparse.ArgumentParser(description="WAD to SVG (1:1 scale)")
     parser.add_argument("wad", help="WAD file")
@@ -191,38 +246,51 @@ def main():
     parser.add_argument("--bg", type=str, default="white", help="Background color (default: white)")
     parser.add_argument("--stroke", type=str, default="black", help="Line color (default: black)")
     parser.add_argument("--list", action="store_true", help="List maps")
+    parser.add_argument("-j", "--jobs", type=int, default=1, metavar="N",
+                        help="Export --all maps in N worker processes (default: 1, 0 = one per CPU core)")
 
     args = parser.parse_args()
+    if args.jobs < 0:
+        parser.error("--jobs must be 0 or greater")
+    jobs = args.jobs or os.cpu_count() or 1
+
+    with WADReader(args.wad) as wad:
+        if args.list:
+            maps = wad.list_maps()
+            print("Maps:" if maps else "No maps")
+            for m in maps:
+                print(" ", m)
+            return
+
+        background = None if args.no_bg else args.bg
+        maps_in_wad = wad.list_maps()
+
+        if args.all:
+            if not maps_in_wad:
+                raise SystemExit("No maps")
+            if jobs > 1 and len(maps_in_wad) > 1:
+                # Maps are independent: each worker exports whole maps from its own mapping
+                export = [(m, f"{args.output}_{m.lower()}.svg", args.canvas, args.line_width,
+                           background, args.stroke) for m in maps_in_wad]
+                with ProcessPoolExecutor(max_workers=min(jobs, len(export)), initializer=_init_worker,
+                                         initargs=(args.wad,)) as pool:
+                    for log in pool.map(_export_in_worker, export):
+                        sys.stdout.write(log)
+            else:
+                for map_name in maps_in_wad:
+                    out_file = f"{args.output}_{map_name.lower()}.svg"
+                    print(f"\n{map_name}:")
+                    doom_map = DoomMap(wad, map_name)
+                    map_to_svg(doom_map, out_file, args.canvas, args.line_width, background, args.stroke)
+        else:
+            map_name = mapnum_to_name(args.mapnum)
+            if map_name not in maps_in_wad:
+                raise SystemExit(f"{map_name} not found. Use --list")
 
-    wad = WADReader(args.wad)
-
-    if args.list:
-        maps = wad.list_maps()
-        print("Maps:" if maps else "No maps")
-        for m in maps:
-            print(" ", m)
-        return
-
-    background = None if args.no_bg else args.bg
-    maps_in_wad = wad.list_maps()
-
-    if args.all:
-        if not maps_in_wad:
-            raise SystemExit("No maps")
-        for map_name in maps_in_wad:
             out_file = f"{args.output}_{map_name.lower()}.svg"
             print(f"\n{map_name}:")
             doom_map = DoomMap(wad, map_name)
             map_to_svg(doom_map, out_file, args.canvas, args.line_width, background, args.stroke)
-    else:
-        map_name = mapnum_to_name(args.mapnum)
-        if map_name not in set(maps_in_wad):
-            raise SystemExit(f"{map_name} not found. Use --list")
-
-        out_file = f"{args.output}_{map_name.lower()}.svg"
-        print(f"\n{map_name}:")
-        doom_map = DoomMap(wad, map_name)
-        map_to_svg(doom_map, out_file, args.canvas, args.line_width, background, args.stroke)
 
     print("\n✓ Done")
 